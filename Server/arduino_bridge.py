@@ -8,17 +8,25 @@ Flow:
 2. Captures image from USB webcam
 3. Sends HTTP POST to FastAPI server for classification
 4. Sends result back to Arduino via Serial: "PLASTIC" or "CAN"
+
+The Arduino waits for a reply before it sends the next READY, so at most one
+event per machine is in flight and there is nothing to batch or cancel.
 """
 
 import serial
 import serial.tools.list_ports
 import requests
-import base64
-import cv2
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import atexit
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import re
 import time
 import logging
 import sys
-from typing import Optional
+from typing import Optional, Tuple
 from services.webcam_service import get_webcam_service
 
 # Configure logging
@@ -30,17 +38,63 @@ logger = logging.getLogger(__name__)
 
 # Configuration
 SERIAL_BAUD = 9600
-SERIAL_TIMEOUT = 1.0
+SERIAL_TIMEOUT = 1.0  # Idle tick of the main loop (camera keep-warm)
 SERVER_BASE_URL = "http://localhost:8000"
-SERVER_URL = f"{SERVER_BASE_URL}/api/vendo/capture-and-classify"
-SESSION_STATUS_URL = f"{SERVER_BASE_URL}/api/vendo/session-status"
+SERVER_URL = f"{SERVER_BASE_URL}/api/vendo/capture-and-classify-upload"
+SERVER_TEST_URL = f"{SERVER_BASE_URL}/api/vendo/test"
+SESSION_AND_TOKEN_URL = f"{SERVER_BASE_URL}/api/vendo/session-and-token"
 CAMERA_INDEX = 0  # Change if you have multiple cameras
+EVENT_QUEUE_SIZE = 4  # Max Arduino messages buffered while an event is being handled
+
+# HTTP timeouts as (connect, read): fail fast when the server is down,
+# but give the Vision API time to answer
+SESSION_TIMEOUT = (0.5, 1.5)
+CLASSIFY_TIMEOUT = (0.5, 5.0)
+
+# Arduino port detection: USB vendor IDs (Arduino, Arduino.org, CH340, CP210x, FTDI)
+# and description keywords
+_ARDUINO_USB_VIDS = frozenset({0x2341, 0x2A03, 0x1A86, 0x10C4, 0x0403})
+_ARDUINO_DESCRIPTION_RE = re.compile(r"ARDUINO|USB\s*SERIAL|CH340|CP210|FTDI", re.IGNORECASE)
 
 # Token cache to reduce HTTP calls
 _cached_token = None
 _token_cache_time = 0
 _TOKEN_CACHE_TTL = 300  # Cache token for 5 minutes
 
+# Short-lived caches of the session check (positive and negative)
+_session_active_until = 0.0
+_no_session_until = 0.0
+_SESSION_CACHE_TTL = 2.0  # Seconds
+
+# Wakes the background token refresher (see invalidate_token)
+_token_refresh_cond = threading.Condition()
+
+# Pooled HTTP session - reuses keep-alive connections to the server
+# instead of paying a new TCP handshake on every READY event.
+# A synchronous client is deliberate: uvicorn only speaks HTTP/1.1, so an async
+# HTTP/2 client would not multiplex anything here, and the independent per-event
+# steps already overlap on _event_pool. The startup /test request warms the pool.
+_session = requests.Session()
+# One immediate retry on connection errors and on 502/503/504 for GETs. urllib3 does not
+# retry POST on status codes, so a classification (which creates a transaction) is never replayed
+_retry = Retry(total=1, backoff_factor=0, status_forcelist=[502, 503, 504], raise_on_status=False)
+_adapter = HTTPAdapter(pool_connections=2, pool_maxsize=4, max_retries=_retry)
+_session.mount("http://", _adapter)
+_session.mount("https://", _adapter)
+atexit.register(_session.close)
+
+# Webcam service opened once in main() and kept open for the bridge's lifetime
+_webcam_service = None
+
+# Serial writes come from the event handler; reads happen on the reader thread
+_serial_write_lock = threading.Lock()
+# Set while a READY is queued but not yet handled (used to drop duplicates)
+_ready_pending = threading.Event()
+
+# Worker pool for running independent READY-event steps concurrently
+_event_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="bridge")
+atexit.register(_event_pool.shutdown, wait=False)
+
 
 def find_arduino_port() -> Optional[str]:
     """
@@ -52,10 +106,8 @@ def find_arduino_port() -> Optional[str]:
     ports = serial.tools.list_ports.comports()
     
     for port in ports:
-        # Common Arduino identifiers
-        if any(keyword in port.description.upper() for keyword in [
-            'ARDUINO', 'USB SERIAL', 'CH340', 'CP210', 'FTDI'
-        ]):
+        # Known USB vendor ID first, then common Arduino identifiers in the description
+        if port.vid in _ARDUINO_USB_VIDS or _ARDUINO_DESCRIPTION_RE.search(port.description or ""):
             logger.info(f"Found Arduino at: {port.device} ({port.description})")
             return port.device
     
@@ -66,23 +118,23 @@ def find_arduino_port() -> Optional[str]:
     return None
 
 
-def capture_webcam_image(camera_index: int = 0) -> Optional[str]:
+def capture_webcam_bytes(camera_index: int = 0) -> Optional[bytes]:
     """
-    Capture image from USB webcam and return as base64
+    Capture image from USB webcam and return raw JPEG bytes
     
     Args:
         camera_index: Index of the camera
         
     Returns:
-        Base64 encoded JPEG image string, or None if failed
+        JPEG image bytes, or None if failed
     """
     try:
-        webcam_service = get_webcam_service(camera_index)
-        image_base64 = webcam_service.capture_image()
+        webcam_service = _webcam_service or get_webcam_service(camera_index)
+        image_bytes = webcam_service.capture_image_bytes()
         
-        if image_base64:
+        if image_bytes:
             logger.info("Webcam image captured successfully")
-            return image_base64
+            return image_bytes
         else:
             logger.error("Failed to capture webcam image")
             return None
@@ -92,12 +144,13 @@ def capture_webcam_image(camera_index: int = 0) -> Optional[str]:
         return None
 
 
-def get_active_token(server_base_url: str) -> Optional[str]:
+def get_active_token(server_base_url: str, force_refresh: bool = False) -> Optional[str]:
     """
     Get active customer JWT token from server (with caching to reduce HTTP calls)
     
     Args:
         server_base_url: Base URL of FastAPI server (e.g., "http://localhost:8000")
+        force_refresh: Ignore the cached token and ask the server
         
     Returns:
         JWT token string or None if not available
@@ -106,7 +159,7 @@ def get_active_token(server_base_url: str) -> Optional[str]:
     
     # Check cache first
     current_time = time.time()
-    if _cached_token and (current_time - _token_cache_time) < _TOKEN_CACHE_TTL:
+    if not force_refresh and _cached_token and (current_time - _token_cache_time) < _TOKEN_CACHE_TTL:
         logger.debug("Using cached token (reduces HTTP latency)")
         return _cached_token
     
@@ -114,7 +167,7 @@ def get_active_token(server_base_url: str) -> Optional[str]:
         token_url = f"{server_base_url}/api/vendo/active-token"
         logger.info(f"Retrieving active token from: {token_url}")
         
-        response = requests.get(token_url, timeout=1.5)  # Reduced timeout for faster response
+        response = _session.get(token_url, timeout=SESSION_TIMEOUT)
         
         if response.status_code == 200:
             result = response.json()
@@ -145,49 +198,99 @@ def get_active_token(server_base_url: str) -> Optional[str]:
         return None
 
 
-def check_session_status(server_base_url: str) -> bool:
+def invalidate_token() -> None:
+    """Drop the cached token and session state and wake the refresher to fetch a new token now"""
+    global _cached_token, _token_cache_time, _session_active_until
+    _cached_token = None
+    _token_cache_time = 0
+    _session_active_until = 0.0
+    with _token_refresh_cond:
+        _token_refresh_cond.notify()
+
+
+def token_refresher(server_base_url: str, stop_event: threading.Event) -> None:
+    """
+    Background thread: keep the cached token fresh so READY events never wait on a token fetch
+    
+    Refreshes every _TOKEN_CACHE_TTL / 2 seconds, or immediately after invalidate_token().
+    
+    Args:
+        server_base_url: Base URL of FastAPI server
+        stop_event: Set to stop the refresher
+    """
+    while not stop_event.is_set():
+        get_active_token(server_base_url, force_refresh=True)
+        with _token_refresh_cond:
+            _token_refresh_cond.wait(timeout=_TOKEN_CACHE_TTL / 2)
+
+
+def fetch_session_and_token(server_base_url: str) -> Tuple[bool, Optional[str]]:
     """
-    Check if there's an active session before processing READY signal
+    Check for an active session and retrieve the active customer token in one request
     
     Args:
         server_base_url: Base URL of FastAPI server
         
     Returns:
-        True if session is active, False otherwise
+        Tuple of (has_session, token). token is None if not available
     """
+    global _cached_token, _token_cache_time, _session_active_until, _no_session_until
+    
+    current_time = time.time()
+    
+    # No session was found very recently - back-to-back false READYs don't hit the server
+    if current_time < _no_session_until:
+        logger.info("⚠️  No active session (cached) - ignoring READY signal")
+        return False, None
+    
+    # Session was seen active very recently and the token is still cached - skip the round-trip
+    if (current_time < _session_active_until and _cached_token
+            and (current_time - _token_cache_time) < _TOKEN_CACHE_TTL):
+        logger.debug("Using cached session status and token (reduces HTTP latency)")
+        return True, _cached_token
+    
     try:
-        logger.info(f"Checking session status: {SESSION_STATUS_URL}")
-        response = requests.get(SESSION_STATUS_URL, timeout=1.5)  # Reduced timeout for faster response
+        logger.info(f"Checking session status and token: {SESSION_AND_TOKEN_URL}")
+        response = _session.get(SESSION_AND_TOKEN_URL, timeout=SESSION_TIMEOUT)
         
         if response.status_code == 200:
             result = response.json()
             has_session = result.get("has_session", False)
+            token = result.get("token")
             
             if has_session:
                 logger.info("✅ Active session found - proceeding with classification")
-                return True
+                _session_active_until = current_time + _SESSION_CACHE_TTL
+                _no_session_until = 0.0
+                if token:
+                    _cached_token = token
+                    _token_cache_time = current_time
+                return True, token
             else:
                 logger.warning("⚠️  No active session - ignoring READY signal")
                 logger.info("💡 User must click 'Insert Trash' button first")
-                return False
+                _session_active_until = 0.0
+                _no_session_until = current_time + _SESSION_CACHE_TTL
+                _cached_token = None
+                return False, None
         else:
             logger.warning(f"Session status check returned {response.status_code}")
-            return False
+            return False, None
             
     except requests.exceptions.ConnectionError:
         logger.error("Cannot connect to server to check session status")
-        return False
+        return False, None
     except Exception as e:
         logger.error(f"Error checking session status: {str(e)}")
-        return False
+        return False, None
 
 
-def classify_trash(image_base64: str, server_url: str, jwt_token: Optional[str] = None) -> Optional[str]:
+def classify_trash(image_bytes: bytes, server_url: str, jwt_token: Optional[str] = None) -> Optional[str]:
     """
-    Send image to server for classification
+    Send image to server for classification (raw JPEG request body)
     
     Args:
-        image_base64: Base64 encoded image
+        image_bytes: JPEG image bytes
         server_url: FastAPI server URL
         jwt_token: Optional JWT token for authentication
         
@@ -197,19 +300,17 @@ def classify_trash(image_base64: str, server_url: str, jwt_token: Optional[str]
     try:
         logger.info(f"Sending image to server: {server_url}")
         
-        headers = {}
+        headers = {"Content-Type": "image/jpeg"}
         if jwt_token:
             headers["Authorization"] = f"Bearer {jwt_token}"
             logger.info("Including JWT token in request")
         
-        response = requests.post(
+        response = _session.post(
             server_url,
-            json={
-                "image_base64": image_base64,
-                "machine_id": 1
-            },
+            params={"machine_id": 1},
+            data=image_bytes,
             headers=headers,
-            timeout=5.0  # Reduced timeout - Vision API should respond faster
+            timeout=CLASSIFY_TIMEOUT
         )
         
         if response.status_code == 200:
@@ -231,6 +332,8 @@ def classify_trash(image_base64: str, server_url: str, jwt_token: Optional[str]
                 return "REJECTED"  # Unknown types are rejected
         elif response.status_code == 401:
             logger.error("Authentication failed: Token expired or invalid")
+            # Don't reuse the rejected token for the next READY
+            invalidate_token()
             return "ERROR"
         elif response.status_code == 403:
             logger.error("Access forbidden: Only customers can perform this action")
@@ -251,6 +354,128 @@ def classify_trash(image_base64: str, server_url: str, jwt_token: Optional[str]
         return "ERROR"
 
 
+def send_to_arduino(ser: serial.Serial, message: str) -> None:
+    """
+    Send a newline-terminated message to the Arduino
+    
+    Each handled event sends exactly one message, so this is one write() per event.
+    
+    Args:
+        ser: Open serial connection
+        message: Message to send (e.g., "PLASTIC", "ERROR")
+    """
+    with _serial_write_lock:
+        ser.write(f"{message}\n".encode('utf-8'))
+
+
+def serial_reader(ser: serial.Serial, line_queue: queue.Queue, stop_event: threading.Event) -> None:
+    """
+    Producer thread: read lines from the Arduino into line_queue
+    
+    Keeps the serial port drained while the main thread is busy handling an event.
+    A READY that arrives while another READY is still queued is dropped, so one
+    object doesn't get classified twice.
+    
+    Args:
+        ser: Open serial connection
+        line_queue: Bounded queue consumed by the main loop
+        stop_event: Set to stop the reader
+    """
+    while not stop_event.is_set():
+        try:
+            # Blocks in the OS until a full line arrives (port has no read timeout);
+            # returns early with partial/empty data only when shutdown calls cancel_read()
+            raw = ser.readline()
+        except serial.SerialException as e:
+            logger.error(f"Serial read error: {str(e)}")
+            break
+        
+        if not raw:
+            continue
+        
+        line = raw.decode('utf-8', errors='replace').strip()
+        if line == "READY":
+            if _ready_pending.is_set():
+                logger.info("READY received while another is still queued - dropping duplicate")
+                continue
+            _ready_pending.set()
+        
+        try:
+            line_queue.put_nowait(line)
+        except queue.Full:
+            logger.warning(f"Event queue full - dropping Arduino message: {line}")
+            if line == "READY":
+                _ready_pending.clear()
+
+
+def handle_ready_event(ser: serial.Serial) -> None:
+    """
+    Handle a READY event: check session, capture, classify and reply to the Arduino
+    
+    Args:
+        ser: Open serial connection
+    """
+    # EVENT-DRIVEN FLOW: Ultrasonic sensor triggered → Process event
+    logger.info("=" * 50)
+    logger.info("EVENT: Object detected by ultrasonic sensor!")
+    logger.info("=" * 50)
+    
+    # Step 0: Check for active session (and get the customer token in the same request)
+    # while capturing the webcam image concurrently, so the capture is off the critical path
+    logger.info("Step 0: [EVENT] Checking for active session and capturing image...")
+    # Skip the speculative capture when the session is already known to be inactive
+    image_future = None
+    if time.time() >= _no_session_until:
+        image_future = _event_pool.submit(capture_webcam_bytes, CAMERA_INDEX)
+    has_session, jwt_token = fetch_session_and_token(SERVER_BASE_URL)
+    if not has_session:
+        logger.warning("=" * 50)
+        logger.warning("⚠️  NO ACTIVE SESSION - Ignoring READY signal")
+        logger.warning("=" * 50)
+        logger.info("User must click 'Insert Trash' button in the web app first.")
+        logger.info("Sending NO_SESSION to Arduino to reset state...")
+        # Send response to Arduino so it doesn't get stuck waiting
+        send_to_arduino(ser, "NO_SESSION")
+        # Let the in-flight capture finish so the camera is free for the next event
+        if image_future is not None:
+            image_future.result()
+        logger.info("Waiting for next READY signal...")
+        logger.info("")
+        return
+    
+    # Step 1: EVENT → Webcam image (captured concurrently with the session check)
+    logger.info("Step 1: [EVENT] Waiting for webcam capture...")
+    if image_future is None:
+        image_future = _event_pool.submit(capture_webcam_bytes, CAMERA_INDEX)
+    image_bytes = image_future.result()
+    
+    if not image_bytes:
+        logger.error("Failed to capture image. Sending ERROR to Arduino.")
+        send_to_arduino(ser, "ERROR")
+        return
+    
+    # Step 2: EVENT → Send to server for classification
+    if not jwt_token:
+        logger.warning("No active customer token found. Requesting classification without token (may fail if auth required)...")
+    
+    logger.info("Step 2: [EVENT] Sending to server for computer vision classification...")
+    result = classify_trash(image_bytes, SERVER_URL, jwt_token)
+    
+    if not result:
+        logger.error("Classification failed. Sending ERROR to Arduino.")
+        send_to_arduino(ser, "ERROR")
+        return
+    
+    # Step 3: EVENT → Send result back to Arduino (feedback loop)
+    logger.info(f"Step 3: [EVENT] Sending classification result to Arduino: {result}")
+    send_to_arduino(ser, result)
+    
+    logger.info("=" * 50)
+    logger.info("EVENT PROCESSING COMPLETE!")
+    logger.info("=" * 50)
+    logger.info("")
+
+
 def main():
     """Main bridge loop"""
     logger.info("=" * 50)
@@ -275,7 +500,11 @@ def main():
     max_retries = 3
     for attempt in range(max_retries):
         try:
-            ser = serial.Serial(arduino_port, SERIAL_BAUD, timeout=SERIAL_TIMEOUT)
+            # No read timeout: the reader thread sleeps until data arrives instead of waking periodically
+            ser = serial.Serial(arduino_port, SERIAL_BAUD, timeout=None)
+            if sys.platform == "win32":
+                # Larger driver buffers so Arduino log bursts never stall the port
+                ser.set_buffer_size(rx_size=65536, tx_size=4096)
             logger.info(f"✅ Connected to Arduino at {arduino_port}")
             time.sleep(2)  # Wait for Arduino to initialize
             break
@@ -311,19 +540,20 @@ def main():
         logger.error("Failed to connect to Arduino after all retries")
         sys.exit(1)
     
-    # Test webcam
+    # Open webcam once and keep it open (avoids per-event open/auto-exposure latency)
+    global _webcam_service
     logger.info("Testing webcam...")
-    webcam_service = get_webcam_service(CAMERA_INDEX)
-    test_image = webcam_service.capture_image()
+    _webcam_service = get_webcam_service(CAMERA_INDEX)
+    test_image = _webcam_service.capture_image_bytes()
     if test_image:
         logger.info("Webcam is working!")
     else:
         logger.warning("Webcam test failed, but continuing anyway...")
     
     # Test server connection
-    logger.info(f"Testing server connection: {SERVER_URL}")
+    logger.info(f"Testing server connection: {SERVER_TEST_URL}")
     try:
-        response = requests.get(SERVER_URL.replace("/capture-and-classify", "/test"), timeout=5.0)
+        response = _session.get(SERVER_TEST_URL, timeout=5.0)
         if response.status_code == 200:
             logger.info("Server is reachable!")
         else:
@@ -337,73 +567,50 @@ def main():
     logger.info("=" * 50)
     logger.info("")
     
-    # Main loop
+    # Main loop: a reader thread drains the serial port into a bounded queue,
+    # this thread handles the events
+    line_queue = queue.Queue(maxsize=EVENT_QUEUE_SIZE)
+    stop_event = threading.Event()
+    reader = threading.Thread(
+        target=serial_reader,
+        args=(ser, line_queue, stop_event),
+        name="serial-reader",
+        daemon=True
+    )
+    reader.start()
+    
+    # Keep the customer token warm in the background
+    refresher = threading.Thread(
+        target=token_refresher,
+        args=(SERVER_BASE_URL, stop_event),
+        name="token-refresher",
+        daemon=True
+    )
+    refresher.start()
+    
     try:
         while True:
-            if ser.in_waiting > 0:
-                line = ser.readline().decode('utf-8').strip()
-                logger.info(f"Received from Arduino: {line}")
-                
-                if line == "READY":
-                    # EVENT-DRIVEN FLOW: Ultrasonic sensor triggered → Process event
-                    logger.info("=" * 50)
-                    logger.info("EVENT: Object detected by ultrasonic sensor!")
-                    logger.info("=" * 50)
-                    
-                    # Step 0: Check if session is active before processing
-                    logger.info("Step 0: [EVENT] Checking for active session...")
-                    if not check_session_status(SERVER_BASE_URL):
-                        logger.warning("=" * 50)
-                        logger.warning("⚠️  NO ACTIVE SESSION - Ignoring READY signal")
-                        logger.warning("=" * 50)
-                        logger.info("User must click 'Insert Trash' button in the web app first.")
-                        logger.info("Sending NO_SESSION to Arduino to reset state...")
-                        # Send response to Arduino so it doesn't get stuck waiting
-                        ser.write(b"NO_SESSION\n")
-                        logger.info("Waiting for next READY signal...")
-                        logger.info("")
-                        continue
-                    
-                    # Step 1: EVENT → Capture webcam image
-                    logger.info("Step 1: [EVENT] Capturing image from webcam...")
-                    image_base64 = capture_webcam_image(CAMERA_INDEX)
-                    
-                    if not image_base64:
-                        logger.error("Failed to capture image. Sending ERROR to Arduino.")
-                        ser.write(b"ERROR\n")
-                        continue
-                    
-                    # Step 2: EVENT → Get active customer token and send to server for classification
-                    logger.info("Step 2: [EVENT] Retrieving active customer token...")
-                    jwt_token = get_active_token(SERVER_BASE_URL)
-                    
-                    if not jwt_token:
-                        logger.warning("No active customer token found. Requesting classification without token (may fail if auth required)...")
-                    
-                    logger.info("Step 2: [EVENT] Sending to server for computer vision classification...")
-                    result = classify_trash(image_base64, SERVER_URL, jwt_token)
-                    
-                    if not result:
-                        logger.error("Classification failed. Sending ERROR to Arduino.")
-                        ser.write(b"ERROR\n")
-                        continue
-                    
-                    # Step 3: EVENT → Send result back to Arduino (feedback loop)
-                    logger.info(f"Step 3: [EVENT] Sending classification result to Arduino: {result}")
-                    ser.write(f"{result}\n".encode('utf-8'))
-                    
-                    logger.info("=" * 50)
-                    logger.info("EVENT PROCESSING COMPLETE!")
-                    logger.info("=" * 50)
-                    logger.info("")
-                
-                elif line.startswith("TRASH DETECTED") or line.startswith("SYSTEM READY"):
-                    # Just log Arduino status messages
-                    pass
-                else:
-                    logger.debug(f"Arduino message: {line}")
+            try:
+                line = line_queue.get(timeout=SERIAL_TIMEOUT)
+            except queue.Empty:
+                if not reader.is_alive():
+                    logger.error("Serial reader stopped - shutting down bridge")
+                    break
+                # Idle: keep the camera buffer fresh for the next READY
+                _webcam_service.keep_warm()
+                continue
+            
+            logger.info(f"Received from Arduino: {line}")
             
-            time.sleep(0.1)  # Small delay to prevent CPU spinning
+            if line == "READY":
+                _ready_pending.clear()
+                handle_ready_event(ser)
+            
+            elif line.startswith("TRASH DETECTED") or line.startswith("SYSTEM READY"):
+                # Just log Arduino status messages
+                pass
+            else:
+                logger.debug(f"Arduino message: {line}")
             
     except KeyboardInterrupt:
         logger.info("")
@@ -411,6 +618,11 @@ def main():
     except Exception as e:
         logger.error(f"Unexpected error: {str(e)}")
     finally:
+        stop_event.set()
+        with _token_refresh_cond:
+            _token_refresh_cond.notify()
+        ser.cancel_read()  # Wake the reader out of its blocking readline()
+        reader.join(timeout=SERIAL_TIMEOUT * 2)
         ser.close()
         logger.info("Serial port closed. Goodbye!")
 
@@ -0,0 +1,62 @@
+"""
+Per-process auth caches
+Shared by the auth dependency (which fills them) and the user controller (which clears them
+after writes), so neither layer has to import the other
+"""
+from cachetools import TTLCache
+from threading import Lock
+from typing import Optional
+import hashlib
+
+# Filled from threadpool workers and read on the event loop, so access goes through the lock
+# Verified JWT payloads keyed by sha256(token) digest - skips the HMAC verify for repeat tokens
+_payload_cache: TTLCache = TTLCache(maxsize=10000, ttl=30)
+# Detached User snapshots keyed by user_id - skips the per-request SELECT
+_auth_user_cache: TTLCache = TTLCache(maxsize=5000, ttl=60)
+_auth_cache_lock = Lock()
+
+
+def _token_key(token: str) -> bytes:
+    """Cache key for a token (binary digest - shorter to hash and compare than hex)"""
+    return hashlib.sha256(token.encode()).digest()
+
+
+def get_cached_payload(token: str) -> Optional[dict]:
+    """Return the cached verified payload for a token, if any"""
+    with _auth_cache_lock:
+        return _payload_cache.get(_token_key(token))
+
+
+def cache_payload(token: str, payload: dict) -> None:
+    """Remember a token's verified payload"""
+    with _auth_cache_lock:
+        _payload_cache[_token_key(token)] = payload
+
+
+def drop_payload(token: str) -> None:
+    """Forget a token's cached payload"""
+    with _auth_cache_lock:
+        _payload_cache.pop(_token_key(token), None)
+
+
+def get_cached_user(user_id: int):
+    """Return the cached User snapshot for an id, if any"""
+    with _auth_cache_lock:
+        return _auth_user_cache.get(user_id)
+
+
+def cache_user(user_id: int, user) -> None:
+    """Remember a detached User snapshot (shared read-only across requests)"""
+    with _auth_cache_lock:
+        _auth_user_cache[user_id] = user
+
+
+def invalidate_auth_cache(user_id: int, token: Optional[str] = None) -> None:
+    """Drop a user's cached auth snapshot (and a token's cached payload, if given)
+    
+    Call after any write to the user row and on logout.
+    """
+    with _auth_cache_lock:
+        _auth_user_cache.pop(user_id, None)
+        if token is not None:
+            _payload_cache.pop(_token_key(token), None)
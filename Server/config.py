@@ -1,7 +1,9 @@
-from pydantic_settings import BaseSettings
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from functools import lru_cache
 from typing import Optional
 import json
 import os
+import re
 import tempfile
 import logging
 
@@ -18,61 +20,62 @@ class Settings(BaseSettings):
     ESP32_PORT: int = 80
     GOOGLE_APPLICATION_CREDENTIALS: Optional[str] = None  # Can be JSON string or file path
     REDIS_URL: Optional[str] = None  # Redis connection URL
+    ARDUINO_SERIAL_PORT: Optional[str] = None  # If set, the server owns the Arduino port (no bridge script)
+    ARDUINO_SERIAL_BAUD: int = 9600
+    INIT_DB: bool = False  # Create tables + seed on startup (otherwise run init_db.py / seed_db.py)
     
-    class Config:
-        env_file = ".env"
-        case_sensitive = True
+    # Frozen: settings are read-only after load, so one cached instance can be shared safely
+    model_config = SettingsConfigDict(env_file=".env", case_sensitive=True, frozen=True)
 
 
-# Create settings instance
-settings = Settings()
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Get the application settings (parsed from env/.env once, then cached)"""
+    return Settings()
+
+
+@lru_cache(maxsize=1)
+def _make_redis_client():
+    """Create the Redis client once (raises on failure, so a failed attempt is not cached)"""
+    import redis
+    settings = get_settings()
+    # Parse Redis URL (supports both redis:// and rediss://)
+    # Add connection pool settings for better reliability
+    client = redis.from_url(
+        settings.REDIS_URL,
+        decode_responses=True,
+        socket_connect_timeout=5,
+        socket_timeout=5,
+        retry_on_timeout=True,
+        health_check_interval=30,
+        max_connections=50
+    )
+    # Test connection
+    client.ping()
+    return client
 
-# Redis client (initialized lazily)
-_redis_client = None
 
 def get_redis_client():
-    """Get or create Redis client instance with retry logic"""
-    global _redis_client
-    if settings.REDIS_URL:
-        # If client exists but connection is closed, reset it
-        if _redis_client is not None:
-            try:
-                _redis_client.ping()
-                return _redis_client
-            except Exception:
-                # Connection lost, reset client
-                logger.warning("Redis connection lost, reconnecting...")
-                _redis_client = None
-        
-        # Create new client
-        if _redis_client is None:
-            try:
-                import redis
-                # Parse Redis URL (supports both redis:// and rediss://)
-                # Add connection pool settings for better reliability
-                _redis_client = redis.from_url(
-                    settings.REDIS_URL,
-                    decode_responses=True,
-                    socket_connect_timeout=5,
-                    socket_timeout=5,
-                    retry_on_timeout=True,
-                    health_check_interval=30
-                )
-                # Test connection
-                _redis_client.ping()
-            except redis.ConnectionError as e:
-                logger.error(f"❌ Redis connection error: {str(e)}")
-                logger.warning("Redis features will be disabled")
-                _redis_client = None
-            except Exception as e:
-                logger.error(f"❌ Failed to connect to Redis: {str(e)}")
-                logger.warning("Redis features will be disabled")
-                _redis_client = None
-    return _redis_client
+    """Get or create Redis client instance
+    
+    The client's connection pool reconnects dropped connections on its own
+    (health_check_interval + retry_on_timeout), so an existing client is
+    returned as-is; only a newly created client is pinged.
+    """
+    settings = get_settings()
+    if not settings.REDIS_URL:
+        return None
+    try:
+        return _make_redis_client()
+    except Exception as e:
+        logger.error(f"❌ Failed to connect to Redis: {str(e)}")
+        logger.warning("Redis features will be disabled")
+        return None
 
 
 def test_redis_connection():
     """Test Redis connection at startup (similar to test_connection for database)"""
+    settings = get_settings()
     logger.info("Attempting to connect to Redis...")
     
     if not settings.REDIS_URL:
@@ -108,13 +111,22 @@ def test_redis_connection():
 
 # Handle Google Cloud credentials
 _google_credentials_file = None
+_ESCAPED_NEWLINE_RE = re.compile(r'\\+n')  # literal \n or \\n left in private_key
 
 def get_google_credentials_path() -> Optional[str]:
     """Get path to Google Cloud credentials file
     
     Handles both JSON string (from .env) and file path formats.
     If JSON string, creates temporary file. If file path, uses directly.
+    Resolved once; later calls return the cached path.
     """
+    return _resolve_credentials_path()
+
+
+@lru_cache(maxsize=1)
+def _resolve_credentials_path() -> Optional[str]:
+    """Resolve GOOGLE_APPLICATION_CREDENTIALS to a file path (runs once)"""
+    settings = get_settings()
     global _google_credentials_file
     
     if not settings.GOOGLE_APPLICATION_CREDENTIALS:
@@ -132,35 +144,13 @@ def get_google_credentials_path() -> Optional[str]:
         
         # If it starts with {, it's likely a JSON string (not a file path)
         if creds_str.startswith('{'):
-            # Try multiple parsing strategies
-            creds_json = None
-            
-            # Strategy 1: Try to parse directly
+            # strict=False tolerates raw control characters (e.g. real newlines in private_key)
             try:
-                creds_json = json.loads(creds_str)
+                creds_json = json.loads(creds_str, strict=False)
             except json.JSONDecodeError:
-                # Strategy 2: Handle escaped newlines
-                # In .env, \\n is stored as literal backslash+n (two chars)
-                # JSON needs \n (escaped newline, two chars in Python string: backslash + n)
-                # So we need: \\\\n (4 backslashes + n in Python) -> \\n (2 backslashes + n in Python)
-                try:
-                    import re
-                    # Replace \\\\n (literal backslash+backslash+n) with \\n (JSON escape sequence)
-                    # This converts the literal backslash+n to the JSON escape sequence
-                    fixed_str = re.sub(r'\\\\n', r'\\n', creds_str)
-                    # Also handle \\\\" -> \\"
-                    fixed_str = re.sub(r'\\\\"', r'\\"', fixed_str)
-                    creds_json = json.loads(fixed_str)
-                except json.JSONDecodeError as e2:
-                    # Strategy 3: Try using raw string replacement
-                    try:
-                        # More direct: replace literal \\n with JSON escape \n
-                        fixed_str = creds_str.replace('\\\\n', '\\n')
-                        fixed_str = fixed_str.replace('\\\\"', '\\"')
-                        creds_json = json.loads(fixed_str)
-                    except Exception as e3:
-                        logger.error(f"All JSON parsing strategies failed. Strategy 2: {str(e2)}, Strategy 3: {str(e3)}")
-                        raise json.JSONDecodeError(f"Could not parse JSON. Last error: {str(e3)}", creds_str, 0)
+                # Escaped JSON: in .env, \\n may be stored as a literal backslash pair + n.
+                # One native unescape pass turns \\n -> \n and \\" -> \" for the JSON parser.
+                creds_json = json.loads(creds_str.encode('utf-8').decode('unicode_escape'), strict=False)
             
             if creds_json:
                 # Create temporary file if not already created
@@ -172,12 +162,9 @@ def get_google_credentials_path() -> Optional[str]:
                     # After JSON parsing, \n escape sequences should become actual newlines
                     # But sometimes they remain as literal \n (backslash+n), which breaks PEM parsing
                     if 'private_key' in creds_json and isinstance(creds_json['private_key'], str):
-                        # Always replace literal \n (backslash+n) with actual newline
+                        # Replace literal backslash(es)+n with an actual newline in one pass
                         # This ensures PEM format is correct regardless of how JSON was parsed
-                        creds_json['private_key'] = creds_json['private_key'].replace('\\n', '\n')
-                        # Also handle any remaining literal backslash+n patterns
-                        import re
-                        creds_json['private_key'] = re.sub(r'\\+n', '\n', creds_json['private_key'])
+                        creds_json['private_key'] = _ESCAPED_NEWLINE_RE.sub('\n', creds_json['private_key'])
                     
                     # Write JSON to temporary file
                     # json.dump will properly escape newlines in the JSON output
@@ -1,69 +1,123 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
 from models import Machine
+from db import MACHINES_CHANGED_CHANNEL, notify_changed
 from schemas import MachineResponse
+from utils import paginate
+from cachetools import TTLCache
 from datetime import datetime
+from threading import Lock
+
+VALID_STATUSES = frozenset(("Online", "Offline", "Maintenance"))
+
+# Constant error results (read-only; routes only read result["error"])
+MACHINE_NOT_FOUND = {"error": "Machine not found"}
+MACHINE_NAME_EXISTS = {"error": "Machine name already exists"}
+INVALID_STATUS_ERROR = {"error": "Invalid status. Must be one of: Online, Offline, Maintenance"}
+
+# Short-lived per-process cache of list pages keyed by (skip, limit) - the same few pages are
+# requested by every dashboard poll. Cleared on machine create/status change - in the writing
+# worker directly, in the others via the machines_changed listener; deposit counters
+# (total_collected, last_activity) may lag by up to MACHINE_LIST_CACHE_TTL.
+MACHINE_LIST_CACHE_TTL = 30  # seconds
+_machine_list_cache: TTLCache = TTLCache(maxsize=64, ttl=MACHINE_LIST_CACHE_TTL)
+_machine_list_cache_lock = Lock()
+
+
+def invalidate_machine_list_cache() -> None:
+    """Drop this process's cached machine list pages - call after a machine is added or changed
+    
+    Writers also queue notify_changed(db, MACHINES_CHANGED_CHANNEL) so other workers clear theirs.
+    """
+    with _machine_list_cache_lock:
+        _machine_list_cache.clear()
+
+
+def _machine_from_orm(machine: Machine) -> MachineResponse:
+    """Build a MachineResponse from a loaded row without re-validating DB-typed values"""
+    return MachineResponse.model_construct(
+        id=machine.id,
+        name=machine.name,
+        location=machine.location,
+        status=machine.status,
+        last_activity=machine.last_activity,
+        bin_capacity=machine.bin_capacity,
+        total_collected=machine.total_collected,
+        created_at=machine.created_at
+    )
 
 
 def create_machine(data: dict, db: Session):
     """Create a new machine - business logic"""
-    # Check if machine name already exists
-    existing = db.query(Machine).filter(Machine.name == data["name"]).first()
-    if existing:
-        return {"error": "Machine name already exists"}
-    
-    new_machine = Machine(
+    # Single INSERT; a duplicate name hits the unique constraint and returns no row
+    stmt = insert(Machine).values(
         name=data["name"],
         location=data["location"],
         bin_capacity=data.get("bin_capacity", 100),
         status="Online"
-    )
+    ).on_conflict_do_nothing(index_elements=["name"]).returning(Machine)
+    new_machine = db.execute(stmt).scalar_one_or_none()
     
-    db.add(new_machine)
+    if new_machine is None:
+        db.rollback()
+        return MACHINE_NAME_EXISTS
+    
+    # Build the response from the RETURNING row before commit expires it
+    response = MachineResponse.model_validate(new_machine)
+    notify_changed(db, MACHINES_CHANGED_CHANNEL)
     db.commit()
-    db.refresh(new_machine)
+    invalidate_machine_list_cache()
     
-    return MachineResponse.model_validate(new_machine)
+    return response
 
 
 def get_all_machines(db: Session, skip: int = 0, limit: int = 100):
-    """Get all machines - business logic"""
-    machines = db.query(Machine).order_by(Machine.created_at.desc()).offset(skip).limit(limit).all()
-    total = db.query(func.count(Machine.id)).scalar()
-    return {
-        "items": [MachineResponse.model_validate(m) for m in machines],
-        "total": total,
-        "skip": skip,
-        "limit": limit,
-        "has_more": (skip + limit) < total
-    }
+    """Get all machines - business logic (pages served from a short TTL cache when possible)"""
+    key = (skip, limit)
+    with _machine_list_cache_lock:
+        cached = _machine_list_cache.get(key)
+    if cached is not None:
+        return cached
+    
+    page = paginate(
+        db,
+        select(Machine).order_by(Machine.created_at.desc()),
+        select(func.count(Machine.id)),
+        skip, limit,
+        lambda row: _machine_from_orm(row.Machine)
+    )
+    with _machine_list_cache_lock:
+        _machine_list_cache[key] = page
+    return page
 
 
 def get_machine_by_id(machine_id: int, db: Session):
     """Get machine by ID - business logic"""
-    machine = db.query(Machine).filter(Machine.id == machine_id).first()
+    machine = db.get(Machine, machine_id)
     
     if not machine:
-        return {"error": "Machine not found"}
+        return MACHINE_NOT_FOUND
     
     return MachineResponse.model_validate(machine)
 
 
 def update_machine_status(machine_id: int, status: str, db: Session):
     """Update machine status - business logic"""
-    machine = db.query(Machine).filter(Machine.id == machine_id).first()
+    machine = db.get(Machine, machine_id)
     
     if not machine:
-        return {"error": "Machine not found"}
+        return MACHINE_NOT_FOUND
     
-    valid_statuses = ["Online", "Offline", "Maintenance"]
-    if status not in valid_statuses:
-        return {"error": f"Invalid status. Must be one of: {', '.join(valid_statuses)}"}
+    if status not in VALID_STATUSES:
+        return INVALID_STATUS_ERROR
     
     machine.status = status
-    machine.last_activity = db.query(func.now()).scalar()
+    machine.last_activity = func.now()  # rendered as NOW() in the UPDATE, no extra SELECT
     
+    notify_changed(db, MACHINES_CHANGED_CHANNEL)
     db.commit()
+    invalidate_machine_list_cache()
     db.refresh(machine)
     
     return MachineResponse.model_validate(machine)
@@ -1,92 +1,120 @@
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session, joinedload, selectinload
 from models import Redemption, User, Reward
-from schemas import RedemptionResponse
+from db import notify_user_changed
+from schemas import RedemptionCreate, RedemptionResponse
+from utils import paginate
+from controllers.reward_controller import reward_from_orm, REWARD_NOT_FOUND
+from controllers.user_controller import USER_NOT_FOUND, invalidate_user_cache
 
+# Constant error results (read-only; routes only read result["error"])
+REDEMPTION_NOT_FOUND = {"error": "Redemption not found"}
+REWARD_UNAVAILABLE = {"error": "Reward is not available"}
+INSUFFICIENT_POINTS = {"error": "Insufficient points"}
+POINTS_MISMATCH = {"error": "Points used must match reward requirement"}
 
-def create_redemption(data: dict, db: Session):
-    """Create a new redemption - business logic"""
-    # Get user and reward
-    user = db.query(User).filter(User.id == data["user_id"]).first()
-    reward = db.query(Reward).filter(Reward.id == data["reward_id"]).first()
+
+def _redemption_from_orm(redemption: Redemption) -> RedemptionResponse:
+    """Build a RedemptionResponse (with its reward) from loaded rows without re-validation"""
+    reward = redemption.reward
+    return RedemptionResponse.model_construct(
+        id=redemption.id,
+        user_id=redemption.user_id,
+        reward_id=redemption.reward_id,
+        points_used=redemption.points_used,
+        reward=reward_from_orm(reward) if reward is not None else None,
+        status=redemption.status,
+        created_at=redemption.created_at
+    )
+
+
+def create_redemption(data: RedemptionCreate, user_id: int, db: Session):
+    """Create a new redemption - business logic
+    
+    Args:
+        data: Validated request body (read directly, no model_dump)
+        user_id: Redeeming user, taken from the JWT by the route
+    """
+    # Get user and reward in one round-trip (reward is None when it doesn't exist)
+    user, reward = db.execute(
+        select(User, Reward)
+        .outerjoin(Reward, Reward.id == data.reward_id)
+        .where(User.id == user_id)
+    ).first() or (None, None)
     
     if not user:
-        return {"error": "User not found"}
+        return USER_NOT_FOUND
     
     if not reward:
-        return {"error": "Reward not found"}
+        return REWARD_NOT_FOUND
     
     if not reward.is_active:
-        return {"error": "Reward is not available"}
+        return REWARD_UNAVAILABLE
     
     # Check if user has enough points
-    if user.total_points < data["points_used"]:
-        return {"error": "Insufficient points"}
+    if user.total_points < data.points_used:
+        return INSUFFICIENT_POINTS
     
     # Verify points match reward requirement
-    if data["points_used"] != reward.points_required:
-        return {"error": "Points used must match reward requirement"}
+    if data.points_used != reward.points_required:
+        return POINTS_MISMATCH
     
     # Create redemption
     new_redemption = Redemption(
-        user_id=data["user_id"],
-        reward_id=data["reward_id"],
-        points_used=data["points_used"],
+        user_id=user_id,
+        reward_id=data.reward_id,
+        points_used=data.points_used,
         status="Completed"
     )
     
     db.add(new_redemption)
     
     # Deduct points from user
-    user.total_points -= data["points_used"]
+    user.total_points -= data.points_used
     
+    notify_user_changed(db, user_id)
     db.commit()
+    invalidate_user_cache(user_id)
     db.refresh(new_redemption)
     
-    # Reload with reward relationship
-    db.refresh(new_redemption)
-    redemption_with_reward = db.query(Redemption).options(
-        joinedload(Redemption.reward)
-    ).filter(Redemption.id == new_redemption.id).first()
-    
-    return RedemptionResponse.model_validate(redemption_with_reward)
+    # reward was loaded above, so the relationship resolves from the identity map
+    return RedemptionResponse.model_validate(new_redemption)
 
 
 def get_redemptions_by_user(user_id: int, db: Session, skip: int = 0, limit: int = 100):
-    """Get redemptions for a user - business logic"""
-    redemptions = db.query(Redemption).options(
-        joinedload(Redemption.reward)
-    ).filter(
-        Redemption.user_id == user_id
-    ).order_by(Redemption.created_at.desc()).offset(skip).limit(limit).all()
-    
-    return [RedemptionResponse.model_validate(r) for r in redemptions]
+    """Get a page of redemptions for a user - business logic"""
+    # selectinload fetches the page's rewards with one IN query instead of joining every row
+    return paginate(
+        db,
+        select(Redemption)
+        .options(selectinload(Redemption.reward))
+        .where(Redemption.user_id == user_id)
+        .order_by(Redemption.created_at.desc()),
+        select(func.count(Redemption.id)).where(Redemption.user_id == user_id),
+        skip, limit,
+        lambda row: _redemption_from_orm(row.Redemption)
+    )
 
 
 def get_redemption_by_id(redemption_id: int, db: Session):
     """Get redemption by ID - business logic"""
-    redemption = db.query(Redemption).options(
-        joinedload(Redemption.reward)
-    ).filter(Redemption.id == redemption_id).first()
+    redemption = db.get(Redemption, redemption_id, options=[joinedload(Redemption.reward)])
     
     if not redemption:
-        return {"error": "Redemption not found"}
+        return REDEMPTION_NOT_FOUND
     
     return RedemptionResponse.model_validate(redemption)
 
 
 def get_all_redemptions(db: Session, skip: int = 0, limit: int = 100):
     """Get all redemptions - business logic (admin only)"""
-    from sqlalchemy import func
-    redemptions = db.query(Redemption).options(
-        joinedload(Redemption.reward)
-    ).order_by(Redemption.created_at.desc()).offset(skip).limit(limit).all()
-    
-    total = db.query(func.count(Redemption.id)).scalar()
-    return {
-        "items": [RedemptionResponse.model_validate(r) for r in redemptions],
-        "total": total,
-        "skip": skip,
-        "limit": limit,
-        "has_more": (skip + limit) < total
-    }
+    return paginate(
+        db,
+        select(Redemption)
+        .options(selectinload(Redemption.reward))
+        .order_by(Redemption.created_at.desc()),
+        select(func.count(Redemption.id)),
+        skip, limit,
+        lambda row: _redemption_from_orm(row.Redemption)
+    )
 
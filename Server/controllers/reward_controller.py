@@ -1,6 +1,42 @@
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from models import Reward
+from db import REWARDS_CHANGED_CHANNEL, notify_changed
 from schemas import RewardResponse
+from cachetools import TTLCache
+from threading import Lock
+
+# Constant error results (read-only; routes only read result["error"])
+REWARD_NOT_FOUND = {"error": "Reward not found"}
+
+# Short-lived per-process cache of the catalog keyed by active_only - every UI load asks for
+# the same list. Cleared whenever a reward is created or updated - in the writing worker directly,
+# in the others via the rewards_changed listener.
+REWARD_LIST_CACHE_TTL = 30  # seconds
+_reward_list_cache: TTLCache = TTLCache(maxsize=4, ttl=REWARD_LIST_CACHE_TTL)
+_reward_list_cache_lock = Lock()
+
+
+def invalidate_reward_list_cache() -> None:
+    """Drop this process's cached catalog - call after a reward is added or changed
+    
+    Writers also queue notify_changed(db, REWARDS_CHANGED_CHANNEL) so other workers clear theirs.
+    """
+    with _reward_list_cache_lock:
+        _reward_list_cache.clear()
+
+
+def reward_from_orm(reward: Reward) -> RewardResponse:
+    """Build a RewardResponse from a loaded row without re-validating DB-typed values"""
+    return RewardResponse.model_construct(
+        id=reward.id,
+        name=reward.name,
+        description=reward.description,
+        points_required=reward.points_required,
+        category=reward.category,
+        is_active=reward.is_active,
+        created_at=reward.created_at
+    )
 
 
 def create_reward(data: dict, db: Session):
@@ -14,38 +50,47 @@ def create_reward(data: dict, db: Session):
     )
     
     db.add(new_reward)
+    notify_changed(db, REWARDS_CHANGED_CHANNEL)
     db.commit()
+    invalidate_reward_list_cache()
     db.refresh(new_reward)
     
     return RewardResponse.model_validate(new_reward)
 
 
 def get_all_rewards(db: Session, active_only: bool = True):
-    """Get all rewards - business logic"""
-    query = db.query(Reward)
+    """Get all rewards - business logic (served from a short TTL cache when possible)"""
+    with _reward_list_cache_lock:
+        cached = _reward_list_cache.get(active_only)
+    if cached is not None:
+        return cached
+    
+    stmt = select(Reward)
     if active_only:
-        query = query.filter(Reward.is_active == True)
+        stmt = stmt.where(Reward.is_active == True)
     
-    rewards = query.all()
-    return [RewardResponse.model_validate(r) for r in rewards]
+    rewards = [reward_from_orm(r) for r in db.execute(stmt).scalars().all()]
+    with _reward_list_cache_lock:
+        _reward_list_cache[active_only] = rewards
+    return rewards
 
 
 def get_reward_by_id(reward_id: int, db: Session):
     """Get reward by ID - business logic"""
-    reward = db.query(Reward).filter(Reward.id == reward_id).first()
+    reward = db.get(Reward, reward_id)
     
     if not reward:
-        return {"error": "Reward not found"}
+        return REWARD_NOT_FOUND
     
     return RewardResponse.model_validate(reward)
 
 
 def update_reward(reward_id: int, data: dict, db: Session):
     """Update reward - business logic"""
-    reward = db.query(Reward).filter(Reward.id == reward_id).first()
+    reward = db.get(Reward, reward_id)
     
     if not reward:
-        return {"error": "Reward not found"}
+        return REWARD_NOT_FOUND
     
     if "name" in data:
         reward.name = data["name"]
@@ -58,8 +103,9 @@ def update_reward(reward_id: int, data: dict, db: Session):
     if "is_active" in data:
         reward.is_active = data["is_active"]
     
+    notify_changed(db, REWARDS_CHANGED_CHANNEL)
     db.commit()
-    db.refresh(reward)
+    invalidate_reward_list_cache()
     
     return RewardResponse.model_validate(reward)
 
@@ -1,20 +1,58 @@
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy.sql import func
+from sqlalchemy.orm import Session
+from typing import Optional, Tuple
+from sqlalchemy import func, select, tuple_
+from datetime import datetime
+import base64
+import uuid
 from models import Transaction, User, Machine
+from db import notify_user_changed
 from schemas import TransactionResponse
+from utils import paginate
+from controllers.user_controller import USER_NOT_FOUND, invalidate_user_cache
+from controllers.machine_controller import MACHINE_NOT_FOUND
 
+# Constant error results (read-only; routes only read result["error"])
+TRANSACTION_NOT_FOUND = {"error": "Transaction not found"}
+INVALID_CURSOR = {"error": "Invalid cursor"}
 
-def create_transaction(data: dict, db: Session):
-    """Create a new transaction - business logic"""
-    # Get user and machine
-    user = db.query(User).filter(User.id == data["user_id"]).first()
-    machine = db.query(Machine).filter(Machine.id == data["machine_id"]).first()
+
+def _transaction_from_orm(transaction: Transaction) -> TransactionResponse:
+    """Build a TransactionResponse from a loaded row without re-validating DB-typed values"""
+    return TransactionResponse.model_construct(
+        id=transaction.id,
+        user_id=transaction.user_id,
+        machine_id=transaction.machine_id,
+        material_type=transaction.material_type,
+        points_earned=transaction.points_earned,
+        status=transaction.status,
+        created_at=transaction.created_at
+    )
+
+
+def load_user_and_machine(user_id: int, machine_id: int, db: Session) -> Tuple[Optional[User], Optional[Machine]]:
+    """Get user and machine in one round-trip (machine is None when it doesn't exist)"""
+    return db.execute(
+        select(User, Machine)
+        .outerjoin(Machine, Machine.id == machine_id)
+        .where(User.id == user_id)
+    ).first() or (None, None)
+
+
+def create_transaction(data: dict, db: Session, user_and_machine: Optional[Tuple[Optional[User], Optional[Machine]]] = None):
+    """Create a new transaction - business logic
+    
+    Args:
+        user_and_machine: Rows already loaded in this session by load_user_and_machine (skips the lookup)
+    """
+    if user_and_machine is None:
+        user_and_machine = load_user_and_machine(data["user_id"], data["machine_id"], db)
+    user, machine = user_and_machine
     
     if not user:
-        return {"error": "User not found"}
+        return USER_NOT_FOUND
     
     if not machine:
-        return {"error": "Machine not found"}
+        return MACHINE_NOT_FOUND
     
     # Create transaction
     new_transaction = Transaction(
@@ -37,48 +75,98 @@ def create_transaction(data: dict, db: Session):
     
     # Update machine stats
     machine.total_collected += 1
-    machine.last_activity = db.query(func.now()).scalar()
+    machine.last_activity = func.now()  # rendered as NOW() in the UPDATE, no extra SELECT
     
+    notify_user_changed(db, user.id)
     db.commit()
+    invalidate_user_cache(user.id)
     db.refresh(new_transaction)
     
     return TransactionResponse.model_validate(new_transaction)
 
 
 def get_transactions_by_user(user_id: int, db: Session, skip: int = 0, limit: int = 100):
-    """Get transactions for a user - business logic"""
-    transactions = db.query(Transaction).options(
-        joinedload(Transaction.user),
-        joinedload(Transaction.machine)
-    ).filter(
-        Transaction.user_id == user_id
-    ).order_by(Transaction.created_at.desc()).offset(skip).limit(limit).all()
-    
-    return [TransactionResponse.model_validate(t) for t in transactions]
+    """Get a page of transactions for a user - business logic"""
+    # TransactionResponse only carries the foreign keys, so user/machine aren't eager-loaded
+    return paginate(
+        db,
+        select(Transaction)
+        .where(Transaction.user_id == user_id)
+        .order_by(Transaction.created_at.desc()),
+        select(func.count(Transaction.id)).where(Transaction.user_id == user_id),
+        skip, limit,
+        lambda row: _transaction_from_orm(row.Transaction)
+    )
 
 
 def get_transaction_by_id(transaction_id, db: Session):
     """Get transaction by ID (UUID) - business logic"""
-    transaction = db.query(Transaction).filter(Transaction.id == transaction_id).first()
+    transaction = db.get(Transaction, transaction_id)
     
     if not transaction:
-        return {"error": "Transaction not found"}
+        return TRANSACTION_NOT_FOUND
     
     return TransactionResponse.model_validate(transaction)
 
 
 def get_all_transactions(db: Session, skip: int = 0, limit: int = 100):
     """Get all transactions - business logic (admin only)"""
-    transactions = db.query(Transaction).options(
-        joinedload(Transaction.user),
-        joinedload(Transaction.machine)
-    ).order_by(Transaction.created_at.desc()).offset(skip).limit(limit).all()
-    total = db.query(func.count(Transaction.id)).scalar()
+    return paginate(
+        db,
+        select(Transaction).order_by(Transaction.created_at.desc()),
+        select(func.count(Transaction.id)),
+        skip, limit,
+        lambda row: _transaction_from_orm(row.Transaction)
+    )
+
+
+def _encode_cursor(transaction: Transaction) -> str:
+    """Opaque keyset cursor: the (created_at, id) of the last row on a page"""
+    raw = f"{transaction.created_at.isoformat()}|{transaction.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> Optional[Tuple[datetime, uuid.UUID]]:
+    """Inverse of _encode_cursor; None if the cursor is malformed"""
+    try:
+        created_at, transaction_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), uuid.UUID(transaction_id)
+    except ValueError:
+        return None
+
+
+def get_transactions_keyset(db: Session, limit: int = 100, cursor: Optional[str] = None, user_id: Optional[int] = None):
+    """Get a page of transactions after a keyset cursor - business logic
+    
+    Walks (created_at, id) newest-first with a range condition instead of OFFSET + COUNT,
+    so each page costs an index range scan no matter how deep it is.
+    
+    Args:
+        cursor: next_cursor from the previous page; None or "" for the first page
+        user_id: Only this user's transactions; None for all (admin)
+    
+    Returns:
+        CursorPage dict (items, limit, has_more, next_cursor), or INVALID_CURSOR
+    """
+    stmt = select(Transaction)
+    if user_id is not None:
+        stmt = stmt.where(Transaction.user_id == user_id)
+    if cursor:
+        position = _decode_cursor(cursor)
+        if position is None:
+            return INVALID_CURSOR
+        stmt = stmt.where(tuple_(Transaction.created_at, Transaction.id) < position)
+    
+    # One extra row tells whether another page exists
+    transactions = db.execute(
+        stmt.order_by(Transaction.created_at.desc(), Transaction.id.desc()).limit(limit + 1)
+    ).scalars().all()
+    has_more = len(transactions) > limit
+    transactions = transactions[:limit]
+    
     return {
-        "items": [TransactionResponse.model_validate(t) for t in transactions],
-        "total": total,
-        "skip": skip,
+        "items": [_transaction_from_orm(t) for t in transactions],
         "limit": limit,
-        "has_more": (skip + limit) < total
+        "has_more": has_more,
+        "next_cursor": _encode_cursor(transactions[-1]) if has_more else None
     }
-
@@ -1,22 +1,80 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import Integer, column, exists, func, select, update, values
+from sqlalchemy.dialects.postgresql import insert
 from models import User
-from utils import hash_password, create_access_token
+from db import notify_user_changed, notify_users_changed
+from auth_cache import invalidate_auth_cache
+from utils import hash_password, create_access_token, paginate
 from schemas import UserResponse
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+import time
+
+# Constant error results (read-only; routes only read result["error"])
+USER_NOT_FOUND = {"error": "User not found"}
+EMAIL_EXISTS = {"error": "Email already exists"}
+USERNAME_EXISTS = {"error": "Username already exists"}
+ADMIN_POINTS_FORBIDDEN = {"error": "Cannot add points to admin users"}
+
+# Exactly the UserResponse fields - list pages select these columns instead of full ORM rows
+USER_RESPONSE_COLUMNS = (
+    User.id,
+    User.email,
+    User.username,
+    User.role,
+    User.is_active,
+    User.total_points,
+    User.total_plastic,
+    User.total_metal,
+    User.total_transactions,
+    User.created_at,
+)
+
+# Per-process cache of validated UserResponse objects for get_user_by_id
+# Maps user_id -> (expires_at, UserResponse); oldest entries evicted past USER_CACHE_SIZE
+USER_CACHE_TTL = 30  # seconds
+USER_CACHE_SIZE = 1024
+_user_cache: "OrderedDict[int, Tuple[float, UserResponse]]" = OrderedDict()
+_user_cache_lock = Lock()
+
+
+def _get_cached_user(user_id: int) -> Optional[UserResponse]:
+    """Return the cached UserResponse if present and not expired"""
+    with _user_cache_lock:
+        entry = _user_cache.get(user_id)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del _user_cache[user_id]
+            return None
+        _user_cache.move_to_end(user_id)
+        return entry[1]
+
+
+def _cache_user(user: UserResponse) -> None:
+    """Store a UserResponse in the cache"""
+    with _user_cache_lock:
+        _user_cache[user.id] = (time.monotonic() + USER_CACHE_TTL, user)
+        _user_cache.move_to_end(user.id)
+        while len(_user_cache) > USER_CACHE_SIZE:
+            _user_cache.popitem(last=False)
+
+
+def invalidate_user_cache(user_id: int) -> None:
+    """Drop a user's cached response - call after any write to that user row
+    
+    Only clears this process; writers also call db.notify_user_changed so other workers
+    clear theirs via the user_changed listener.
+    """
+    with _user_cache_lock:
+        _user_cache.pop(user_id, None)
+    # The auth dependency keeps its own User snapshots
+    invalidate_auth_cache(user_id)
 
 
 def create_user(data: dict, db: Session):
     """Create a new user - business logic"""
-    # Check if user exists
-    existing_user = db.query(User).filter(
-        (User.email == data["email"]) | (User.username == data["username"])
-    ).first()
-    
-    if existing_user:
-        if existing_user.email == data["email"]:
-            return {"error": "Email already exists"}
-        return {"error": "Username already exists"}
-    
     # Create new user
     # Only allow customer role during registration (admin role must be set by existing admin)
     role = data.get("role", "customer")
@@ -24,7 +82,8 @@ def create_user(data: dict, db: Session):
     if role != "customer":
         role = "customer"
     
-    new_user = User(
+    # Single INSERT; a duplicate email/username hits a unique constraint and returns no row
+    stmt = insert(User).values(
         email=data["email"],
         username=data["username"],
         hashed_password=hash_password(data["password"]),
@@ -34,23 +93,39 @@ def create_user(data: dict, db: Session):
         total_plastic=0,
         total_metal=0,
         total_transactions=0
-    )
-    
-    db.add(new_user)
+    ).on_conflict_do_nothing().returning(User)
+    new_user = db.execute(stmt).scalar_one_or_none()
+    
+    if new_user is None:
+        db.rollback()
+        # Conflict path only: find out which field was taken (index-only EXISTS probe on ix_users_email)
+        email_taken = db.scalar(select(exists().where(User.email == data["email"])))
+        if email_taken:
+            return EMAIL_EXISTS
+        return USERNAME_EXISTS
+    
+    # Build the response from the RETURNING row before commit expires it
+    response = UserResponse.model_validate(new_user)
     db.commit()
-    db.refresh(new_user)
+    invalidate_user_cache(response.id)
     
-    return UserResponse.model_validate(new_user)
+    return response
 
 
 def get_user_by_id(user_id: int, db: Session):
-    """Get user by ID - business logic"""
-    user = db.query(User).filter(User.id == user_id).first()
+    """Get user by ID - business logic (served from a short TTL cache when possible)"""
+    cached = _get_cached_user(user_id)
+    if cached is not None:
+        return cached
+    
+    user = db.get(User, user_id)
     
     if not user:
-        return {"error": "User not found"}
+        return USER_NOT_FOUND
     
-    return UserResponse.model_validate(user)
+    response = UserResponse.model_validate(user)
+    _cache_user(response)
+    return response
 
 
 def get_all_users(db: Session, skip: int = 0, limit: int = 100, role_filter: str = None):
@@ -59,48 +134,80 @@ def get_all_users(db: Session, skip: int = 0, limit: int = 100, role_filter: str
     Args:
         role_filter: If provided, filter by role (e.g., 'customer', 'admin')
     """
-    query = db.query(User)
+    stmt = select(*USER_RESPONSE_COLUMNS)
+    count_stmt = select(func.count(User.id))
     
     # Filter by role if specified
     if role_filter:
-        query = query.filter(User.role == role_filter)
-    
-    users = query.order_by(User.created_at.desc()).offset(skip).limit(limit).all()
-    
-    # Count total (with filter if applied)
-    count_query = db.query(func.count(User.id))
-    if role_filter:
-        count_query = count_query.filter(User.role == role_filter)
-    total = count_query.scalar()
-    
-    return {
-        "items": [UserResponse.model_validate(u) for u in users],
-        "total": total,
-        "skip": skip,
-        "limit": limit,
-        "has_more": (skip + limit) < total
-    }
+        stmt = stmt.where(User.role == role_filter)
+        count_stmt = count_stmt.where(User.role == role_filter)
+    
+    # Plain column rows, no ORM instances; values are already DB-typed so skip validation
+    # (model_construct ignores the extra "total" key)
+    return paginate(
+        db,
+        stmt.order_by(User.created_at.desc()),
+        count_stmt,
+        skip, limit,
+        lambda row: UserResponse.model_construct(**row._mapping)
+    )
 
 
 def add_points_to_user(user_id: int, points: int, db: Session):
     """Add points to a user - business logic (admin only)"""
-    user = db.query(User).filter(User.id == user_id).first()
-    
-    if not user:
-        return {"error": "User not found"}
-    
-    if user.role == "admin":
-        return {"error": "Cannot add points to admin users"}
+    # One UPDATE ... RETURNING; GREATEST clamps at zero in SQL so there is no read-modify-write
+    user = db.execute(
+        update(User)
+        .where(User.id == user_id, User.role != "admin")
+        .values(total_points=func.greatest(User.total_points + points, 0))
+        .returning(User)
+    ).scalar_one_or_none()
+    
+    if user is None:
+        # Miss path only: tell a missing user from an admin
+        role = db.scalar(select(User.role).where(User.id == user_id))
+        if role is None:
+            return USER_NOT_FOUND
+        return ADMIN_POINTS_FORBIDDEN
+    
+    response = UserResponse.model_validate(user)
+    notify_user_changed(db, user_id)
+    db.commit()
+    invalidate_user_cache(user_id)
     
-    # Add points
-    user.total_points += points
+    return response
+
+
+def add_points_bulk(pairs: List[Tuple[int, int]], db: Session) -> List[UserResponse]:
+    """Add points to many users in one statement - business logic (admin only)
     
-    # Ensure points don't go negative
-    if user.total_points < 0:
-        user.total_points = 0
+    Args:
+        pairs: (user_id, points) deltas; repeated user_ids are summed
     
+    Returns:
+        UserResponse for each updated user; missing users and admins are skipped
+    """
+    deltas: Dict[int, int] = {}
+    for user_id, points in pairs:
+        deltas[user_id] = deltas.get(user_id, 0) + points
+    if not deltas:
+        return []
+    
+    # UPDATE users ... FROM (VALUES ...) - one round-trip however many users
+    delta_rows = values(
+        column("user_id", Integer), column("points", Integer), name="deltas"
+    ).data(list(deltas.items()))
+    users = db.execute(
+        update(User)
+        .where(User.id == delta_rows.c.user_id, User.role != "admin")
+        .values(total_points=func.greatest(User.total_points + delta_rows.c.points, 0))
+        .returning(User)
+    ).scalars().all()
+    
+    responses = [UserResponse.model_validate(user) for user in users]
+    notify_users_changed(db, [response.id for response in responses])
     db.commit()
-    db.refresh(user)
+    for response in responses:
+        invalidate_user_cache(response.id)
     
-    return UserResponse.model_validate(user)
-
+    return responses
@@ -1,48 +1,83 @@
 import httpx
+import asyncio
 import logging
-from config import settings
+from config import get_settings
+from collections import OrderedDict
 from typing import Optional, Dict
 from services.vision_service import vision_service
+from sqlalchemy.orm import Session
 from db import SessionLocal
-from controllers.transaction_controller import create_transaction
-from threading import Lock
+from controllers.transaction_controller import create_transaction, load_user_and_machine
+
+settings = get_settings()
 
 logger = logging.getLogger(__name__)
 
 # Token storage for Arduino bridge access
-# Maps user_id -> JWT token
-_customer_tokens: Dict[int, str] = {}
-_token_lock = Lock()
+# Maps user_id -> JWT token, least to most recently stored; the oldest entries are dropped past
+# MAX_CUSTOMER_TOKENS so the store can't grow without bound. Only touched from the event loop.
+MAX_CUSTOMER_TOKENS = 512
+_customer_tokens: "OrderedDict[int, str]" = OrderedDict()
+
+# Shared ESP32 HTTP client - keeps the LAN connection alive across commands (created lazily)
+_esp32_client: Optional[httpx.AsyncClient] = None
+
+# Fallback user for bridge captures without a logged-in customer (looked up once per process)
+_default_user_id: Optional[int] = None
+_default_user_lock = asyncio.Lock()
+
+# Camera index that last produced a frame (probed once, re-probed only after a failure)
+CAMERA_PROBE_INDICES = range(3)
+_working_camera_index: Optional[int] = None
+_camera_probe_lock = asyncio.Lock()
+
+
+def _get_esp32_client() -> httpx.AsyncClient:
+    """Get the shared ESP32 client, creating it on first use"""
+    global _esp32_client
+    if _esp32_client is None or _esp32_client.is_closed:
+        _esp32_client = httpx.AsyncClient(
+            base_url=f"http://{settings.ESP32_IP}:{settings.ESP32_PORT}",
+            timeout=5.0,
+            limits=httpx.Limits(max_keepalive_connections=2, keepalive_expiry=60)
+        )
+    return _esp32_client
+
+
+async def close_esp32_client() -> None:
+    """Close the shared ESP32 client (called on application shutdown)"""
+    global _esp32_client
+    if _esp32_client is not None:
+        await _esp32_client.aclose()
+        _esp32_client = None
 
 
 async def send_command_to_esp32(material: str) -> dict:
     """Send command to ESP32/Arduino - business logic"""
     try:
-        esp32_url = f"http://{settings.ESP32_IP}:{settings.ESP32_PORT}/command"
+        client = _get_esp32_client()
+        response = await client.post(
+            "/command",
+            json={
+                "command": "SORT",
+                "material": material
+            }
+        )
         
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            response = await client.post(
-                esp32_url,
-                json={
-                    "command": "SORT",
-                    "material": material
-                }
-            )
+        if response.status_code == 200:
+            logger.info(f"Command sent to ESP32: {material}")
+            return {
+                "status": "success",
+                "message": f"Command sent: {material}",
+                "response": response.json()
+            }
+        else:
+            logger.error(f"ESP32 returned status {response.status_code}")
+            return {
+                "status": "error",
+                "message": f"ESP32 returned status {response.status_code}"
+            }
             
-            if response.status_code == 200:
-                logger.info(f"Command sent to ESP32: {material}")
-                return {
-                    "status": "success",
-                    "message": f"Command sent: {material}",
-                    "response": response.json()
-                }
-            else:
-                logger.error(f"ESP32 returned status {response.status_code}")
-                return {
-                    "status": "error",
-                    "message": f"ESP32 returned status {response.status_code}"
-                }
-                
     except httpx.TimeoutException:
         logger.error("ESP32 connection timeout")
         return {
@@ -62,18 +97,18 @@ async def get_esp32_status() -> dict:
     try:
         esp32_url = f"http://{settings.ESP32_IP}:{settings.ESP32_PORT}/status"
         
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            response = await client.get(esp32_url)
+        client = _get_esp32_client()
+        response = await client.get("/status")
+        
+        if response.status_code == 200:
+            return response.json()
+        else:
+            return {
+                "status": "error",
+                "message": f"ESP32 returned status {response.status_code}",
+                "esp32_url": esp32_url
+            }
             
-            if response.status_code == 200:
-                return response.json()
-            else:
-                return {
-                    "status": "error",
-                    "message": f"ESP32 returned status {response.status_code}",
-                    "esp32_url": esp32_url
-                }
-                
     except httpx.TimeoutException:
         logger.warning(f"ESP32 status check timeout - device may be offline at {settings.ESP32_IP}:{settings.ESP32_PORT}")
         return {
@@ -98,61 +133,47 @@ async def get_esp32_status() -> dict:
         }
 
 
-async def capture_and_classify_trash(machine_id: int = 1, user_id: Optional[int] = None) -> Dict:
+async def capture_and_classify_trash(
+    machine_id: int = 1, user_id: Optional[int] = None, db: Optional[Session] = None
+) -> Dict:
     """
     Capture image from webcam and classify trash
     
     Args:
         machine_id: Machine ID for transaction
         user_id: Optional user ID (if None, uses default test user)
+        db: Session to reuse (e.g. the request's); if None, one is opened and closed here
         
     Returns:
         Dict with status, material_type, confidence, points_earned, transaction_id
     """
     try:
-        from services.webcam_service import get_webcam_service
-        import cv2
-        
         # Capture image from webcam
         logger.info("Capturing image from webcam...")
+        image_bytes = await _capture_from_webcam()
         
-        # Try different camera indices (0, 1, 2)
-        image_base64 = None
-        for camera_index in range(3):
-            try:
-                webcam_service = get_webcam_service(camera_index)
-                image_base64 = webcam_service.capture_image()
-                if image_base64:
-                    logger.info(f"Successfully captured image from camera index {camera_index}")
-                    break
-            except Exception as e:
-                logger.warning(f"Failed to capture from camera index {camera_index}: {str(e)}")
-                continue
-        
-        if not image_base64:
+        if not image_bytes:
             error_msg = "Failed to capture image from webcam. Please ensure webcam is connected and not used by another application."
             logger.error(error_msg)
             raise Exception(error_msg)
         
         logger.info("Image captured successfully, classifying...")
         
-        # Use default user if not provided (for bridge script)
-        if user_id is None:
-            # Try to get a default user (admin or first user)
-            from models import User
+        # One session (one pool checkout) for the default-user lookup and the transaction insert,
+        # opened only after the capture so no connection is held during camera I/O
+        owns_session = db is None
+        if owns_session:
             db = SessionLocal()
-            try:
-                default_user = db.query(User).filter(User.is_active == True).first()
-                if default_user:
-                    user_id = default_user.id
-                    logger.info(f"Using default user ID: {user_id}")
-                else:
-                    raise Exception("No active user found in database. Please register or login first.")
-            finally:
-                db.close()
-        
-        # Classify using existing function
-        return await classify_trash_image(image_base64, user_id, machine_id)
+        try:
+            # Use default user if not provided (for bridge script)
+            if user_id is None:
+                user_id = await _get_default_user_id(db)
+            
+            # Classify using existing function
+            return await classify_trash_image_bytes(image_bytes, user_id, machine_id, db)
+        finally:
+            if owns_session:
+                await asyncio.to_thread(db.close)
         
     except Exception as e:
         error_msg = str(e)
@@ -168,6 +189,74 @@ async def capture_and_classify_trash(machine_id: int = 1, user_id: Optional[int]
             raise Exception(f"Classification error: {error_msg}")
 
 
+async def _capture_from_webcam() -> Optional[bytes]:
+    """
+    Capture a JPEG from the working camera, probing indices only when needed
+    
+    The first call (or the first after a failed capture) tries each index in
+    CAMERA_PROBE_INDICES and remembers the one that works; later calls go
+    straight to it instead of re-opening devices that aren't there.
+    
+    Returns:
+        JPEG image bytes, or None if no camera produced a frame
+    """
+    global _working_camera_index
+    from services.webcam_service import get_webcam_service
+    
+    camera_index = _working_camera_index
+    if camera_index is not None:
+        # Device I/O blocks - keep it off the event loop
+        image_bytes = await asyncio.to_thread(get_webcam_service(camera_index).capture_image_bytes)
+        if image_bytes:
+            return image_bytes
+        logger.warning(f"Camera index {camera_index} stopped producing frames, re-probing...")
+    
+    async with _camera_probe_lock:
+        _working_camera_index = None
+        for camera_index in CAMERA_PROBE_INDICES:
+            try:
+                image_bytes = await asyncio.to_thread(get_webcam_service(camera_index).capture_image_bytes)
+                if image_bytes:
+                    logger.info(f"Successfully captured image from camera index {camera_index}")
+                    _working_camera_index = camera_index
+                    return image_bytes
+            except Exception as e:
+                logger.warning(f"Failed to capture from camera index {camera_index}: {str(e)}")
+    return None
+
+
+async def _get_default_user_id(db: Session) -> int:
+    """
+    Get the first active user's ID, querying the database only on first use
+    
+    Args:
+        db: Caller's session, used for the one-time lookup
+    
+    Returns:
+        User ID to attribute bridge captures to
+    """
+    global _default_user_id
+    if _default_user_id is not None:
+        return _default_user_id
+    
+    async with _default_user_lock:
+        if _default_user_id is None:
+            # Blocking DB call - run it off the event loop
+            default_user_id = await asyncio.to_thread(_query_default_user_id, db)
+            if default_user_id is None:
+                raise Exception("No active user found in database. Please register or login first.")
+            _default_user_id = default_user_id
+            logger.info(f"Using default user ID: {_default_user_id}")
+    return _default_user_id
+
+
+def _query_default_user_id(db: Session) -> Optional[int]:
+    """Look up the first active user (admin or first user); runs in a worker thread"""
+    from models import User
+    from sqlalchemy import select
+    return db.scalar(select(User.id).where(User.is_active == True).limit(1))
+
+
 def store_customer_token(user_id: int, token: str) -> None:
     """
     Store JWT token for customer to be used by Arduino bridge
@@ -176,9 +265,11 @@ def store_customer_token(user_id: int, token: str) -> None:
         user_id: Customer user ID
         token: JWT token string
     """
-    with _token_lock:
-        _customer_tokens[user_id] = token
-        logger.info(f"Stored token for customer user_id: {user_id}")
+    _customer_tokens[user_id] = token
+    _customer_tokens.move_to_end(user_id)
+    while len(_customer_tokens) > MAX_CUSTOMER_TOKENS:
+        _customer_tokens.popitem(last=False)
+    logger.info(f"Stored token for customer user_id: {user_id}")
 
 
 def get_customer_token(user_id: int) -> Optional[str]:
@@ -191,8 +282,7 @@ def get_customer_token(user_id: int) -> Optional[str]:
     Returns:
         JWT token string or None if not found
     """
-    with _token_lock:
-        return _customer_tokens.get(user_id)
+    return _customer_tokens.get(user_id)
 
 
 def remove_customer_token(user_id: int) -> None:
@@ -202,10 +292,8 @@ def remove_customer_token(user_id: int) -> None:
     Args:
         user_id: Customer user ID
     """
-    with _token_lock:
-        if user_id in _customer_tokens:
-            del _customer_tokens[user_id]
-            logger.info(f"Removed token for customer user_id: {user_id}")
+    if _customer_tokens.pop(user_id, None) is not None:
+        logger.info(f"Removed token for customer user_id: {user_id}")
 
 
 def get_active_customer_token() -> Optional[str]:
@@ -215,28 +303,38 @@ def get_active_customer_token() -> Optional[str]:
     Returns:
         JWT token string or None if no active customer
     """
-    with _token_lock:
-        if _customer_tokens:
-            # Return the most recent token (last one in dict)
-            return list(_customer_tokens.values())[-1]
-        return None
+    # Newest entry is last (store_customer_token moves it there) - O(1)
+    return next(reversed(_customer_tokens.values()), None)
 
 
-async def classify_trash_image(image_base64: str, user_id: int, machine_id: int) -> Dict:
+async def classify_trash_image_bytes(
+    image_bytes: bytes, user_id: int, machine_id: int, db: Optional[Session] = None
+) -> Dict:
     """
-    Classify trash image and create transaction
+    Classify raw JPEG image bytes and create transaction
     
     Args:
-        image_base64: Base64 encoded JPEG image
+        image_bytes: JPEG image bytes
         user_id: User ID for transaction
         machine_id: Machine ID for transaction
+        db: Session to reuse; if None, one is opened and closed here
         
     Returns:
         Dict with status, material_type, confidence, points_earned, transaction_id
     """
+    owns_session = db is None
+    if owns_session:
+        db = SessionLocal()
     try:
-        # Classify using Google Vision
-        classification = await vision_service.classify_trash(image_base64)
+        # Load user + machine in a worker thread while the Vision API call is in flight,
+        # so the lookup is off the critical path (sync SQLAlchemy - keep it off the event loop)
+        prefetch = asyncio.create_task(asyncio.to_thread(load_user_and_machine, user_id, machine_id, db))
+        try:
+            # Classify using Google Vision
+            classification = await vision_service.classify_trash_bytes(image_bytes)
+        finally:
+            # The session must not be touched again until the prefetch thread is done with it
+            user_and_machine = await prefetch
         material_type = classification["material_type"]
         
         # If item is rejected, don't create transaction
@@ -254,26 +352,25 @@ async def classify_trash_image(image_base64: str, user_id: int, machine_id: int)
         points = 2 if material_type == "PLASTIC" else 1
         
         # Create transaction in database
-        db = SessionLocal()
-        try:
-            transaction = create_transaction({
-                "user_id": user_id,
-                "machine_id": machine_id,
-                "material_type": material_type,
-                "points_earned": points
-            }, db)
-            
-            return {
-                "status": "success",
-                "material_type": material_type,
-                "confidence": classification["confidence"],
-                "points_earned": points,
-                "transaction_id": str(transaction.id)  # UUID as string
-            }
-        finally:
-            db.close()
+        transaction = await asyncio.to_thread(create_transaction, {
+            "user_id": user_id,
+            "machine_id": machine_id,
+            "material_type": material_type,
+            "points_earned": points
+        }, db, user_and_machine)
+        
+        return {
+            "status": "success",
+            "material_type": material_type,
+            "confidence": classification["confidence"],
+            "points_earned": points,
+            "transaction_id": str(transaction.id)  # UUID as string
+        }
             
     except Exception as e:
         logger.error(f"Error classifying trash: {str(e)}")
         raise
-
+    finally:
+        # close() rolls back the open transaction - a DB round-trip, so also off the loop
+        if owns_session:
+            await asyncio.to_thread(db.close)
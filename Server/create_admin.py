@@ -3,6 +3,7 @@ Manual script to create admin user
 Run this if admin user doesn't exist: python create_admin.py
 """
 from db import SessionLocal
+from sqlalchemy import select
 from models import User
 from utils import hash_password
 import logging
@@ -17,7 +18,7 @@ def create_admin_user():
     
     try:
         # Check if admin already exists
-        admin_user = db.query(User).filter(User.email == "admin@vendotrash.com").first()
+        admin_user = db.execute(select(User).where(User.email == "admin@vendotrash.com")).scalar_one_or_none()
         
         if admin_user:
             logger.info("ℹ️  Admin user already exists!")
@@ -1,8 +1,15 @@
 from sqlalchemy import create_engine, text
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, Session
+from starlette.concurrency import run_in_threadpool
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, Optional
 import logging
-from config import settings
+import select
+import threading
+from config import get_settings
+
+settings = get_settings()
 
 # Setup logger
 logger = logging.getLogger(__name__)
@@ -16,22 +23,35 @@ engine = create_engine(
     settings.DATABASE_URL,
     echo=settings.DEBUG,  # Log SQL queries if DEBUG is True
     pool_pre_ping=True,  # Verify connections before using
+    pool_size=20,  # Steady-state connections (default 5 starves under request bursts)
+    max_overflow=10,  # Extra connections allowed during spikes
+    pool_recycle=1800,  # Replace connections older than 30 min before the server/proxy drops them
+    pool_use_lifo=True,  # Reuse the most recent connection so idle extras can time out
+    query_cache_size=1200,  # Room for every compiled statement the app issues
 )
 
 # Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# expire_on_commit=False: objects keep their loaded values after commit, so building the
+# response doesn't trigger a reload SELECT (sessions are per-request, so staleness isn't a concern)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 
 # Base class for models
 Base = declarative_base()
 
 
-def get_db():
-    """Dependency to get database session"""
+async def get_db():
+    """Dependency to get database session
+    
+    Async generator: creating a Session does no I/O (the connection is checked out on the
+    first query), so setup runs on the event loop; only close(), which rolls back and returns
+    the connection, goes to the threadpool. A sync generator dependency costs a thread hop
+    on both ends of every request.
+    """
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
+        await run_in_threadpool(db.close)
 
 
 def test_connection():
@@ -50,7 +70,132 @@ def test_connection():
         return False
 
 
-# Test connection on import
-if __name__ != "__main__":
-    test_connection()
+# Advisory lock key for schema creation + seeding (any app-unique bigint)
+INIT_DB_LOCK_KEY = 727727
+
+
+@contextmanager
+def advisory_lock(key: int) -> Iterator[None]:
+    """Hold a Postgres session-level advisory lock for the block, waiting until it is free
+    
+    Blocking on purpose: a worker that gave up instead would start serving while the holder
+    is still creating tables. Waiters then run the (idempotent) block themselves.
+    """
+    with engine.connect() as conn:
+        conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": key})
+        try:
+            yield
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": key})
+
+
+# Cross-worker cache invalidation: writers NOTIFY inside their transaction, every worker LISTENs
+USER_CHANGED_CHANNEL = "user_changed"  # payload: user id
+MACHINES_CHANGED_CHANNEL = "machines_changed"  # payload unused - clear the whole machine list cache
+REWARDS_CHANGED_CHANNEL = "rewards_changed"  # payload unused - clear the whole reward list cache
+_listener_thread: Optional[threading.Thread] = None
+_listener_stop = threading.Event()
+_listener_ready = threading.Event()  # set while a LISTEN is active
+
+
+def notify_changed(db: Session, channel: str, payload: str = "") -> None:
+    """Queue a change notification on the session's transaction
+    
+    Postgres delivers it only when the transaction commits (and drops it on rollback),
+    so listeners never invalidate for a write that didn't happen.
+    """
+    db.execute(
+        text("SELECT pg_notify(:channel, :payload)"),
+        {"channel": channel, "payload": payload}
+    )
+
+
+def notify_user_changed(db: Session, user_id: int) -> None:
+    """Queue a user_changed notification for one user (see notify_changed)"""
+    notify_changed(db, USER_CHANGED_CHANNEL, str(user_id))
+
+
+def notify_users_changed(db: Session, user_ids: Iterable[int]) -> None:
+    """notify_user_changed for many users in one statement (one NOTIFY per id, one round-trip)"""
+    ids = list(user_ids)
+    if not ids:
+        return
+    db.execute(
+        text("SELECT pg_notify(:channel, id::text) FROM unnest(CAST(:ids AS integer[])) AS id"),
+        {"channel": USER_CHANGED_CHANNEL, "ids": ids}
+    )
+
+
+def _listen_changes(handlers: Dict[str, Callable[[str], None]]) -> None:
+    """Listener thread body: hold one LISTEN connection and dispatch notifications by channel"""
+    while not _listener_stop.is_set():
+        raw = None
+        try:
+            # Dedicated connection, detached so it never goes back into the request pool.
+            # Take the psycopg2 connection before detach(): detaching clears the pool record
+            # that driver_connection reads through, leaving it None
+            raw = engine.raw_connection()
+            conn = raw.dbapi_connection
+            raw.detach()
+            conn.autocommit = True
+            with conn.cursor() as cursor:
+                for channel in handlers:
+                    cursor.execute(f"LISTEN {channel}")
+            _listener_ready.set()
+            logger.info(f"Listening for {', '.join(handlers)} notifications")
+            
+            while not _listener_stop.is_set():
+                # Wake at least once a second to notice shutdown
+                if select.select([conn], [], [], 1.0) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notification = conn.notifies.pop(0)
+                    try:
+                        handlers[notification.channel](notification.payload)
+                    except Exception as e:
+                        logger.warning(f"Error handling {notification.channel} payload {notification.payload!r}: {str(e)}")
+        except Exception as e:
+            logger.error(f"❌ Change listener error: {str(e)}")
+            # Back off before reconnecting
+            _listener_stop.wait(5)
+        finally:
+            _listener_ready.clear()
+            if raw is not None:
+                try:
+                    raw.close()
+                except Exception:
+                    pass
+
+
+def start_change_listener(handlers: Dict[str, Callable[[str], None]]) -> None:
+    """Start the background LISTEN thread for this worker (idempotent)
+    
+    Args:
+        handlers: Channel name -> callback taking the notification payload
+    """
+    global _listener_thread
+    if _listener_thread is not None and _listener_thread.is_alive():
+        return
+    _listener_stop.clear()
+    _listener_thread = threading.Thread(
+        target=_listen_changes,
+        args=(dict(handlers),),
+        name="change-listener",
+        daemon=True
+    )
+    _listener_thread.start()
+
+
+def wait_for_change_listener(timeout: float) -> bool:
+    """Block until the LISTEN thread is subscribed; False if it isn't within timeout seconds"""
+    return _listener_ready.wait(timeout)
+
 
+def stop_change_listener() -> None:
+    """Stop the LISTEN thread and close its connection"""
+    global _listener_thread
+    _listener_stop.set()
+    if _listener_thread is not None:
+        _listener_thread.join(timeout=2)
+        _listener_thread = None
@@ -1,21 +1,88 @@
-from fastapi import Depends, HTTPException, status, Request
+from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import bindparam, inspect, lambda_stmt, select
+from sqlalchemy.orm import Session, load_only
 from typing import Optional
+import time
+from auth_cache import cache_payload, cache_user, drop_payload, get_cached_payload, get_cached_user
 from db import get_db
 from models import User
+from controllers.user_controller import USER_RESPONSE_COLUMNS
 from utils import verify_token
 
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
+# Auth user lookup, built once: the lambda's closure is the cache key, so each call skips
+# constructing the statement and generating its cache key. Only the UserResponse columns
+# (what routes read off current_user, /me included); hashed_password and updated_at stay
+# in the database.
+_USER_BY_ID = lambda_stmt(
+    lambda: select(User)
+    .where(User.id == bindparam("uid"))
+    .options(load_only(*USER_RESPONSE_COLUMNS))
+)
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    """Dependency to get current authenticated user from JWT token"""
-    token = credentials.credentials
+
+def _cached_verify(token: str) -> Optional[dict]:
+    """verify_token with a short TTL cache of successful results"""
+    payload = get_cached_payload(token)
+    if payload is not None:
+        # The cache TTL can outlive the token itself
+        if payload.get("exp", 0) > time.time():
+            return payload
+        drop_payload(token)
+        return None
+    
     payload = verify_token(token)
+    if payload is not None:
+        cache_payload(token, payload)
+    return payload
+
+
+def _snapshot_user(user: User) -> User:
+    """Copy a user's loaded column values into a transient User not bound to any session
+    
+    The cached object must not be tied to the request session that loaded it (a rollback
+    there would expire it), and it is shared read-only across requests. Unloaded columns
+    are skipped rather than lazy-loaded.
+    """
+    unloaded = inspect(user).unloaded
+    return User(**{
+        attr.key: getattr(user, attr.key)
+        for attr in inspect(User).column_attrs
+        if attr.key not in unloaded
+    })
+
+
+def _load_user(user_id: int, db: Session) -> Optional[User]:
+    """Blocking user lookup that also caches a snapshot; runs in the threadpool"""
+    user = db.execute(_USER_BY_ID, {"uid": user_id}).scalar_one_or_none()
+    if user is not None:
+        cache_user(user_id, _snapshot_user(user))
+    return user
+
+
+async def _get_user_cached(user_id: int, db: Session) -> Optional[User]:
+    """Load a user by id, serving a recent snapshot when one is cached
+    
+    A cache hit is answered on the event loop; only a miss takes a threadpool slot.
+    """
+    user = get_cached_user(user_id)
+    if user is not None:
+        return user
+    
+    return await run_in_threadpool(_load_user, user_id, db)
+
+
+async def _resolve_user(token: str, db: Session) -> User:
+    """Verify a bearer token and load its active user - the one path both auth dependencies share
+    
+    Raises:
+        HTTPException: 401 for a bad token or unknown user, 403 for an inactive user
+    """
+    payload = _cached_verify(token)
     
     if payload is None:
         raise HTTPException(
@@ -24,18 +91,20 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    user_id_raw = payload.get("sub")
-    if user_id_raw is None:
+    # verify_token requires 'sub', so it is always present here
+    user_id_raw = payload["sub"]
+    
+    # Convert string to int if needed (JWT 'sub' is stored as string)
+    try:
+        user_id = int(user_id_raw)
+    except (TypeError, ValueError):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid token payload",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Convert string to int if needed (JWT 'sub' is stored as string)
-    user_id = int(user_id_raw) if isinstance(user_id_raw, str) else user_id_raw
-    
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await _get_user_cached(user_id, db)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -52,42 +121,33 @@ def get_current_user(
     return user
 
 
-def get_current_user_optional(
-    request: Request,
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> User:
+    """Dependency to get current authenticated user from JWT token
+    
+    Async so the token check (pure CPU, usually cached) runs inline; only the DB lookup on a
+    cache miss is sent to the threadpool.
+    """
+    return await _resolve_user(credentials.credentials, db)
+
+
+async def get_current_user_optional(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
     db: Session = Depends(get_db)
 ) -> Optional[User]:
     """Optional dependency to get current authenticated user from JWT token (returns None if not authenticated)"""
+    # HTTPBearer(auto_error=False) already parsed the header; None means no bearer token
+    if credentials is None:
+        return None
     try:
-        # Check if Authorization header exists
-        auth_header = request.headers.get("Authorization")
-        if not auth_header or not auth_header.startswith("Bearer "):
-            return None
-        
-        # Extract token
-        token = auth_header.replace("Bearer ", "")
-        payload = verify_token(token)
-        
-        if payload is None:
-            return None
-        
-        user_id_raw = payload.get("sub")
-        if user_id_raw is None:
-            return None
-        
-        # Convert string to int if needed (JWT 'sub' is stored as string)
-        user_id = int(user_id_raw) if isinstance(user_id_raw, str) else user_id_raw
-        
-        user = db.query(User).filter(User.id == user_id).first()
-        if user is None or not user.is_active:
-            return None
-        
-        return user
-    except Exception:
-        # If any error occurs (missing token, invalid token, etc.), return None
+        return await _resolve_user(credentials.credentials, db)
+    except HTTPException:
         return None
 
 
-def get_admin_user(
+async def get_admin_user(
     current_user: User = Depends(get_current_user)
 ) -> User:
     """Dependency to ensure current user is admin"""
@@ -99,7 +159,7 @@ def get_admin_user(
     return current_user
 
 
-def get_customer_user(
+async def get_customer_user(
     current_user: User = Depends(get_current_user)
 ) -> User:
     """Dependency to ensure current user is a customer (not admin)"""
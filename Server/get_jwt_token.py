@@ -5,13 +5,17 @@ import requests
 import json
 import sys
 
+# Shared session: keeps the connection alive when get_token is called repeatedly
+_SESSION = requests.Session()
+
+
 def get_token(email: str, password: str, server_url: str = "http://localhost:8000"):
     """Get JWT token from login endpoint"""
     try:
-        response = requests.post(
+        response = _SESSION.post(
             f"{server_url}/api/auth/login",
             json={"email": email, "password": password},
-            headers={"Content-Type": "application/json"}
+            timeout=5  # Don't hang forever on an unreachable server
         )
         
         if response.status_code == 200:
@@ -35,7 +39,7 @@ def get_token(email: str, password: str, server_url: str = "http://localhost:800
             print(f"❌ Login failed: Status {response.status_code}")
             print(f"Response: {response.text}")
             return None
-    except requests.exceptions.ConnectionError:
+    except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
         print("❌ Cannot connect to server!")
         print(f"   Make sure server is running: python Server/main.py")
         return None
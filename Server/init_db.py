@@ -2,7 +2,7 @@
 Database initialization script
 Run this to create all database tables
 """
-from db import Base, engine
+from db import Base, engine, advisory_lock, INIT_DB_LOCK_KEY
 from models import User, Transaction, Machine, Redemption, Reward
 import logging
 
@@ -15,8 +15,10 @@ def init_database():
     logger.info("Creating database tables...")
     
     try:
-        # Create all tables
-        Base.metadata.create_all(bind=engine)
+        # Same lock as the INIT_DB startup path, so this never races a starting server
+        with advisory_lock(INIT_DB_LOCK_KEY):
+            # Create all tables
+            Base.metadata.create_all(bind=engine)
         logger.info("✅ Database tables created successfully!")
         
         # List created tables
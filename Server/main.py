@@ -1,8 +1,13 @@
 from fastapi import FastAPI
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
-from db import test_connection, Base, engine
+from config import get_settings
+from db import (
+    test_connection, Base, engine, advisory_lock, INIT_DB_LOCK_KEY,
+    USER_CHANGED_CHANNEL, MACHINES_CHANGED_CHANNEL, REWARDS_CHANGED_CHANNEL,
+    start_change_listener, stop_change_listener
+)
 import logging
 import uvicorn
 
@@ -26,21 +31,47 @@ async def lifespan(app: FastAPI):
     from config import test_redis_connection
     test_redis_connection()
     
-    # Create database tables
-    logger.info("Creating database tables...")
-    try:
-        Base.metadata.create_all(bind=engine)
-        logger.info("✅ Database tables created successfully!")
-        
-        # Seed initial data
-        from seed_db import seed_database
-        seed_database()
-    except Exception as e:
-        logger.error(f"❌ Error initializing database: {str(e)}")
+    settings = get_settings()
+    
+    # Create database tables + seed only when asked (INIT_DB=1) - not on every worker/reload start
+    if settings.INIT_DB:
+        try:
+            # Workers take turns: the first creates tables + seeds, the rest wait for it and then
+            # find everything in place (create_all and the seed skip what exists) - none starts
+            # serving before the tables are there
+            with advisory_lock(INIT_DB_LOCK_KEY):
+                logger.info("Creating database tables...")
+                Base.metadata.create_all(bind=engine)
+                logger.info("✅ Database tables created successfully!")
+                
+                # Seed initial data
+                from seed_db import seed_database
+                seed_database()
+        except Exception as e:
+            logger.error(f"❌ Error initializing database: {str(e)}")
+    
+    # Direct Arduino serial link (optional - replaces arduino_bridge.py on the same host)
+    from services.serial_service import start_arduino_serial, stop_arduino_serial
+    from routes.vendo import handle_arduino_ready
+    await start_arduino_serial(settings.ARDUINO_SERIAL_PORT, settings.ARDUINO_SERIAL_BAUD, handle_arduino_ready)
+    
+    # Drop this worker's cached users / list pages when any worker writes them
+    from controllers.user_controller import invalidate_user_cache
+    from controllers.machine_controller import invalidate_machine_list_cache
+    from controllers.reward_controller import invalidate_reward_list_cache
+    start_change_listener({
+        USER_CHANGED_CHANNEL: lambda payload: invalidate_user_cache(int(payload)),
+        MACHINES_CHANGED_CHANNEL: lambda payload: invalidate_machine_list_cache(),
+        REWARDS_CHANGED_CHANNEL: lambda payload: invalidate_reward_list_cache(),
+    })
     
     yield
-    # Shutdown (if needed in the future)
+    # Shutdown
     logger.info("Shutting down application...")
+    await stop_arduino_serial()
+    from controllers.vendo_controller import close_esp32_client
+    await close_esp32_client()
+    stop_change_listener()
 
 
 app = FastAPI(
@@ -48,7 +79,8 @@ app = FastAPI(
     description="VendoTrash Vending Machine API",
     version="1.0.0",
     lifespan=lifespan,
-    redirect_slashes=False  # Disable automatic trailing slash redirects
+    redirect_slashes=False,  # Disable automatic trailing slash redirects
+    default_response_class=ORJSONResponse  # orjson encodes large list pages several times faster than json
 )
 
 # CORS Middleware
@@ -69,6 +101,9 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Preflights are answered here, before routing; a long max-age lets browsers reuse the
+    # answer instead of sending OPTIONS again (browsers cap it: Chrome 2h, Firefox 24h)
+    max_age=86400,
 )
 
 # Register routes
@@ -80,12 +115,6 @@ app.include_router(machines.router, prefix="/api/machines", tags=["machines"])
 app.include_router(rewards.router, prefix="/api/rewards", tags=["rewards"])
 app.include_router(vendo.router, prefix="/api/vendo", tags=["vendo"])
 
-# Debug: Log registered routes
-logger.info("Registered routes:")
-for route in app.routes:
-    if hasattr(route, 'path') and hasattr(route, 'methods'):
-        logger.info(f"  {list(route.methods)} {route.path}")
-
 
 @app.get("/")
 async def root():
@@ -99,17 +128,28 @@ async def health_check():
     return {"status": "healthy"}
 
 
-@app.get("/api/test-routes")
-async def test_routes():
-    """Test endpoint to verify routes are registered"""
-    routes_info = []
-    for route in app.routes:
-        if hasattr(route, 'path') and hasattr(route, 'methods'):
-            routes_info.append({
-                "path": route.path,
-                "methods": list(route.methods)
-            })
-    return {"routes": routes_info, "total": len(routes_info)}
+if get_settings().DEBUG:
+    @app.get("/api/test-routes")
+    async def test_routes():
+        """Test endpoint to verify routes are registered (DEBUG only)"""
+        # Routes don't change at runtime - built once below
+        return _ROUTES_PAYLOAD
+
+
+# Registered routes, collected once after every route above is defined
+_ROUTES_PAYLOAD = {
+    "routes": [
+        {"path": route.path, "methods": list(route.methods)}
+        for route in app.routes
+        if hasattr(route, 'path') and hasattr(route, 'methods')
+    ]
+}
+_ROUTES_PAYLOAD["total"] = len(_ROUTES_PAYLOAD["routes"])
+
+# Debug: Log registered routes (one record instead of one per route)
+logger.info("Registered routes:\n" + "\n".join(
+    f"  {route['methods']} {route['path']}" for route in _ROUTES_PAYLOAD["routes"]
+))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,45 @@
+"""
+Migration script to add (user_id, created_at DESC) indexes for per-user history
+Run this once: python migrate_add_user_history_indexes.py
+
+New databases get these from models.py via create_all; this adds them to existing tables
+and drops the single-column ix_transactions_user_id that the composite index makes redundant.
+"""
+from db import engine
+from sqlalchemy import text
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def migrate_add_user_history_indexes():
+    """Create composite indexes backing get_transactions_by_user / get_redemptions_by_user"""
+    try:
+        with engine.connect() as conn:
+            logger.info("Creating composite indexes...")
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_transactions_user_created "
+                "ON transactions (user_id, created_at DESC)"
+            ))
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_redemptions_user_created "
+                "ON redemptions (user_id, created_at DESC)"
+            ))
+            # Leading user_id column of the composite covers every lookup the old index served
+            logger.info("Dropping redundant single-column index...")
+            conn.execute(text("DROP INDEX IF EXISTS ix_transactions_user_id"))
+            conn.commit()
+            
+            logger.info("✅ Migration completed successfully!")
+            logger.info("   - ix_transactions_user_created ON transactions (user_id, created_at DESC)")
+            logger.info("   - ix_redemptions_user_created ON redemptions (user_id, created_at DESC)")
+            logger.info("   - Dropped ix_transactions_user_id (covered by ix_transactions_user_created)")
+            
+    except Exception as e:
+        logger.error(f"❌ Migration failed: {str(e)}")
+        raise
+
+
+if __name__ == "__main__":
+    migrate_add_user_history_indexes()
@@ -12,6 +12,15 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+TRANSACTION_INDEXES = (
+    "CREATE INDEX ix_transactions_id ON transactions(id)",
+    # Per-user history index; its leading user_id column also serves plain user_id lookups
+    "CREATE INDEX ix_transactions_user_created ON transactions(user_id, created_at DESC)",
+    "CREATE INDEX ix_transactions_machine_id ON transactions(machine_id)",
+    "CREATE INDEX ix_transactions_created_at ON transactions(created_at)",
+)
+
+
 def migrate_transaction_to_uuid():
     """Change Transaction ID from Integer to UUID"""
     try:
@@ -36,11 +45,25 @@ def migrate_transaction_to_uuid():
             conn.execute(text("DROP TABLE IF EXISTS transactions CASCADE"))
             conn.commit()
             
+            # Time-ordered UUIDv7 generator for the server-side default (matches models._uuid7):
+            # a v4 UUID with its first 48 bits replaced by the Unix ms timestamp and version 7
+            conn.execute(text("""
+                CREATE OR REPLACE FUNCTION uuid_generate_v7() RETURNS uuid AS $$
+                    SELECT encode(
+                        set_bit(set_bit(
+                            overlay(uuid_send(gen_random_uuid())
+                                    placing substring(int8send(floor(extract(epoch FROM clock_timestamp()) * 1000)::bigint) FROM 3)
+                                    FROM 1 FOR 6),
+                            52, 1), 53, 1),
+                        'hex')::uuid
+                $$ LANGUAGE sql VOLATILE
+            """))
+            
             # Recreate transactions table with UUID
             logger.info("Creating transactions table with UUID...")
             create_table_query = text("""
                 CREATE TABLE transactions (
-                    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+                    id UUID PRIMARY KEY DEFAULT uuid_generate_v7(),
                     user_id INTEGER NOT NULL REFERENCES users(id),
                     machine_id INTEGER NOT NULL REFERENCES machines(id),
                     material_type VARCHAR NOT NULL,
@@ -51,12 +74,10 @@ def migrate_transaction_to_uuid():
             """)
             conn.execute(create_table_query)
             
-            # Create indexes
+            # Create indexes - one round-trip for all of them, in the same transaction as the table
+            # (the table is new and empty, so CONCURRENTLY would buy nothing)
             logger.info("Creating indexes...")
-            conn.execute(text("CREATE INDEX ix_transactions_id ON transactions(id)"))
-            conn.execute(text("CREATE INDEX ix_transactions_user_id ON transactions(user_id)"))
-            conn.execute(text("CREATE INDEX ix_transactions_machine_id ON transactions(machine_id)"))
-            conn.execute(text("CREATE INDEX ix_transactions_created_at ON transactions(created_at)"))
+            conn.exec_driver_sql(";\n".join(TRANSACTION_INDEXES))
             conn.commit()
             
             logger.info("✅ Migration completed successfully!")
@@ -1,11 +1,25 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
+import os
+import time
 import uuid
 from db import Base
 
 
+def _uuid7() -> uuid.UUID:
+    """Time-ordered UUIDv7 (RFC 9562): 48-bit Unix ms timestamp, version/variant bits, random rest
+    
+    New ids sort after older ones, so inserts land on the right edge of the primary-key
+    B-tree instead of scattering like random v4 ids.
+    """
+    value = (time.time_ns() // 1_000_000) << 80 | int.from_bytes(os.urandom(10), "big")
+    value = (value & ~(0xF << 76)) | (0x7 << 76)  # version 7
+    value = (value & ~(0x3 << 62)) | (0x2 << 62)  # RFC 4122 variant
+    return uuid.UUID(int=value)
+
+
 class User(Base):
     """User model for VendoTrash"""
     __tablename__ = "users"
@@ -23,9 +37,9 @@ class User(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
-    # Relationships
-    transactions = relationship("Transaction", back_populates="user")
-    redemptions = relationship("Redemption", back_populates="user")
+    # Relationships (lazy="raise": history is always queried explicitly, never loaded by attribute access)
+    transactions = relationship("Transaction", back_populates="user", lazy="raise")
+    redemptions = relationship("Redemption", back_populates="user", lazy="raise")
 
 
 class Machine(Base):
@@ -43,14 +57,14 @@ class Machine(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     # Relationships
-    transactions = relationship("Transaction", back_populates="machine")
+    transactions = relationship("Transaction", back_populates="machine", lazy="raise")
 
 
 class Transaction(Base):
     """Transaction model - tracks trash deposits"""
     __tablename__ = "transactions"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=_uuid7, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     machine_id = Column(Integer, ForeignKey("machines.id"), nullable=False)
     material_type = Column(String, nullable=False)  # PLASTIC, NON_PLASTIC
@@ -58,9 +72,14 @@ class Transaction(Base):
     status = Column(String, default="Completed")  # Completed, Pending, Failed
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
-    # Relationships
-    user = relationship("User", back_populates="transactions")
-    machine = relationship("Machine", back_populates="transactions")
+    # Relationships (raise_on_sql: an identity-map hit is fine, an N+1 SELECT per row is not)
+    user = relationship("User", back_populates="transactions", lazy="raise_on_sql")
+    machine = relationship("Machine", back_populates="transactions", lazy="raise_on_sql")
+    
+    # Per-user history is read newest-first: lets Postgres walk the index instead of sorting
+    __table_args__ = (
+        Index("ix_transactions_user_created", "user_id", created_at.desc()),
+    )
 
 
 class Reward(Base):
@@ -77,7 +96,7 @@ class Reward(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     # Relationships
-    redemptions = relationship("Redemption", back_populates="reward")
+    redemptions = relationship("Redemption", back_populates="reward", lazy="raise")
 
 
 class Redemption(Base):
@@ -91,7 +110,13 @@ class Redemption(Base):
     status = Column(String, default="Completed")  # Completed, Pending, Failed
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
-    # Relationships
-    user = relationship("User", back_populates="redemptions")
-    reward = relationship("Reward", back_populates="redemptions")
+    # Relationships (raise_on_sql: list queries must eager-load reward; an identity-map hit
+    # such as create_redemption's already-loaded reward still resolves)
+    user = relationship("User", back_populates="redemptions", lazy="raise_on_sql")
+    reward = relationship("Reward", back_populates="redemptions", lazy="raise_on_sql")
+    
+    # Per-user history is read newest-first: lets Postgres walk the index instead of sorting
+    __table_args__ = (
+        Index("ix_redemptions_user_created", "user_id", created_at.desc()),
+    )
 
@@ -1,8 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy.orm import Session
+from db import get_db
 from schemas import LoginRequest, LoginResponse
 from controllers.auth_controller import login_user
 from dependencies import get_current_user
+from auth_cache import invalidate_auth_cache
 from models import User
 import logging
 
@@ -10,30 +13,25 @@ router = APIRouter()
 logger = logging.getLogger(__name__)
 security = HTTPBearer()
 
+# login_user failure message -> (status_code, detail, headers)
+_LOGIN_ERRORS = {
+    "User not found": (status.HTTP_404_NOT_FOUND, "User not found", None),
+    "Wrong password": (status.HTTP_401_UNAUTHORIZED, "Invalid email or password", {"WWW-Authenticate": "Bearer"}),
+    "User is inactive": (status.HTTP_403_FORBIDDEN, "User account is inactive", None),
+}
+
 
 @router.post("/login", response_model=LoginResponse)
-def login(data: LoginRequest):
+def login(data: LoginRequest, db: Session = Depends(get_db)):
     """Login endpoint with proper error handling"""
     try:
-        result = login_user(data.model_dump())
+        result = login_user(data, db)
         
         # Check for errors and raise appropriate HTTP exceptions
-        if result.message == "User not found":
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="User not found"
-            )
-        elif result.message == "Wrong password":
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid email or password",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        elif result.message == "User is inactive":
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="User account is inactive"
-            )
+        error = _LOGIN_ERRORS.get(result.message)
+        if error is not None:
+            status_code, detail, headers = error
+            raise HTTPException(status_code=status_code, detail=detail, headers=headers)
         
         # Success - return response
         return result
@@ -59,6 +57,7 @@ def logout(
         # For JWT, logout is typically client-side (just remove token)
         # But we can log the logout event for tracking
         logger.info(f"User {current_user.id} ({current_user.email}) logged out")
+        invalidate_auth_cache(current_user.id, credentials.credentials)
         
         # If you want server-side token invalidation, you'd need a token blacklist
         # For now, we just acknowledge the logout
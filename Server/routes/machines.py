@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
 from db import get_db
+from utils import paginated_response
 from schemas import MachineCreate, MachineResponse, PaginatedResponse
 from controllers.machine_controller import (
     create_machine,
@@ -25,7 +26,7 @@ def get_machines_route(
     db: Session = Depends(get_db)
 ):
     """Get all machines with pagination"""
-    return get_all_machines(db, skip, limit)
+    return paginated_response(get_all_machines(db, skip, limit))
 
 
 @router.get("/{machine_id}", response_model=MachineResponse)
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, Query, HTTPException, status
 from sqlalchemy.orm import Session
 from db import get_db
+from utils import paginated_response
 from dependencies import get_current_user
 from models import User
 from schemas import RedemptionCreate, RedemptionResponse, PaginatedResponse
@@ -21,11 +22,8 @@ def create_redemption_route(
     db: Session = Depends(get_db)
 ):
     """Create a new redemption (requires authentication)"""
-    # Override user_id from token
-    redemption_dict = redemption_data.model_dump()
-    redemption_dict["user_id"] = current_user.id
-    
-    result = create_redemption(redemption_dict, db)
+    # user_id always comes from the token
+    result = create_redemption(redemption_data, current_user.id, db)
     
     # Check for errors and return appropriate HTTP status codes
     if isinstance(result, dict) and "error" in result:
@@ -65,20 +63,10 @@ def get_redemptions_route(
     """Get redemptions for current user or all redemptions (admin only) with pagination"""
     # If admin requests all redemptions
     if all.lower() == "true" and current_user.role == 'admin':
-        return get_all_redemptions(db, skip, limit)
+        return paginated_response(get_all_redemptions(db, skip, limit))
     
     # Regular users get their own redemptions (return as paginated response)
-    from sqlalchemy import func
-    from models import Redemption
-    redemptions = get_redemptions_by_user(current_user.id, db, skip, limit)
-    total = db.query(func.count(Redemption.id)).filter(Redemption.user_id == current_user.id).scalar()
-    return {
-        "items": redemptions,
-        "total": total,
-        "skip": skip,
-        "limit": limit,
-        "has_more": (skip + limit) < total
-    }
+    return paginated_response(get_redemptions_by_user(current_user.id, db, skip, limit))
 
 
 @router.get("/{redemption_id}", response_model=RedemptionResponse)
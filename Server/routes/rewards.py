@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, Query, HTTPException, status
 from sqlalchemy.orm import Session
 from db import get_db
+from utils import list_response
 from schemas import RewardCreate, RewardResponse, RewardUpdate
 from controllers.reward_controller import (
     create_reward,
@@ -32,7 +33,7 @@ def get_rewards_route(
     db: Session = Depends(get_db)
 ):
     """Get available rewards catalog"""
-    return get_all_rewards(db, active_only=active_only)
+    return list_response(get_all_rewards(db, active_only=active_only))
 
 
 @router.get("/{reward_id}", response_model=RewardResponse)
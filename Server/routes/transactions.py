@@ -1,19 +1,26 @@
 from fastapi import APIRouter, Depends, Query, HTTPException, status
 from sqlalchemy.orm import Session
+import re
 import uuid
 from db import get_db
+from utils import paginated_response
 from dependencies import get_current_user
-from models import User, Transaction
-from schemas import TransactionCreate, TransactionResponse, PaginatedResponse
+from models import User
+from typing import Optional, Union
+from schemas import TransactionCreate, TransactionResponse, PaginatedResponse, CursorPage
 from controllers.transaction_controller import (
     create_transaction,
     get_transactions_by_user,
     get_transaction_by_id,
-    get_all_transactions
+    get_all_transactions,
+    get_transactions_keyset
 )
 
 router = APIRouter()
 
+# Canonical hyphenated UUID - rejects malformed ids (scanners, typos) without raising inside uuid.UUID
+_UUID_RE = re.compile(r'[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}')
+
 
 @router.post("/", response_model=TransactionResponse)
 def create_transaction_route(
@@ -45,43 +52,51 @@ def create_transaction_route(
     return result
 
 
-@router.get("/", response_model=PaginatedResponse[TransactionResponse])
+@router.get("/", response_model=Union[PaginatedResponse[TransactionResponse], CursorPage[TransactionResponse]])
 def get_transactions_route(
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=1000),
     all: str = Query("false", description="Get all transactions (admin only) - pass 'true'"),
+    cursor: Optional[str] = Query(
+        None,
+        description="Keyset pagination: pass an empty value for the first page, then each page's "
+                    "next_cursor (skip is ignored and no total is computed)"
+    ),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get transactions for current user or all transactions (admin only) with pagination"""
+    all_transactions = all.lower() == "true" and current_user.role == 'admin'
+    
+    # Keyset mode: no COUNT, constant cost per page however deep
+    if cursor is not None:
+        result = get_transactions_keyset(
+            db, limit, cursor, user_id=None if all_transactions else current_user.id
+        )
+        if "error" in result:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=result["error"]
+            )
+        return paginated_response(result)
+    
     # If admin requests all transactions
-    if all.lower() == "true" and current_user.role == 'admin':
-        return get_all_transactions(db, skip, limit)
+    if all_transactions:
+        return paginated_response(get_all_transactions(db, skip, limit))
     
     # Regular users get their own transactions (return as paginated response)
-    transactions = get_transactions_by_user(current_user.id, db, skip, limit)
-    from sqlalchemy import func
-    total = db.query(func.count(Transaction.id)).filter(Transaction.user_id == current_user.id).scalar()
-    return {
-        "items": transactions,
-        "total": total,
-        "skip": skip,
-        "limit": limit,
-        "has_more": (skip + limit) < total
-    }
+    return paginated_response(get_transactions_by_user(current_user.id, db, skip, limit))
 
 
 @router.get("/{transaction_id}", response_model=TransactionResponse)
 def get_transaction_route(transaction_id: str, db: Session = Depends(get_db)):
     """Get transaction by ID (UUID)"""
-    try:
-        transaction_uuid = uuid.UUID(transaction_id)
-    except ValueError:
+    if not _UUID_RE.fullmatch(transaction_id):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid transaction ID format"
         )
-    result = get_transaction_by_id(transaction_uuid, db)
+    result = get_transaction_by_id(uuid.UUID(transaction_id), db)
     
     if isinstance(result, dict) and "error" in result:
         raise HTTPException(
@@ -1,11 +1,12 @@
+from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
 from db import get_db
 from dependencies import get_current_user, get_admin_user
 from models import User
-from schemas import UserCreate, UserResponse, UserCreateResponse, PaginatedResponse, AddPointsRequest
-from controllers.user_controller import create_user, get_user_by_id, get_all_users, add_points_to_user
-from utils import create_access_token
+from schemas import UserCreate, UserResponse, UserCreateResponse, PaginatedResponse, AddPointsRequest, BulkAddPointsRequest
+from controllers.user_controller import create_user, get_user_by_id, get_all_users, add_points_to_user, add_points_bulk
+from utils import create_access_token, paginated_response
 
 router = APIRouter()
 
@@ -36,7 +37,9 @@ def create_user_route(user_data: UserCreate, db: Session = Depends(get_db)):
 @router.get("/me", response_model=UserResponse)
 def get_current_user_route(current_user: User = Depends(get_current_user)):
     """Get current authenticated user"""
-    return UserResponse.model_validate(current_user)
+    # response_model validates the ORM object once (from_attributes); wrapping it in
+    # UserResponse here would add a second validate + model_dump round
+    return current_user
 
 
 @router.get("/", response_model=PaginatedResponse[UserResponse])
@@ -44,7 +47,7 @@ def get_all_users_route(
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=1000),
     role: str = Query(None, description="Filter by role (e.g., 'customer', 'admin')"),
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(get_admin_user),  # Non-admins get 403 before the handler runs
     db: Session = Depends(get_db)
 ):
     """Get all users (admin only) with pagination
@@ -52,14 +55,7 @@ def get_all_users_route(
     Args:
         role: Optional filter to show only customers or admins
     """
-    # Only admin can view all users
-    if current_user.role != 'admin':
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Admin access required"
-        )
-    
-    return get_all_users(db, skip, limit, role_filter=role)
+    return paginated_response(get_all_users(db, skip, limit, role_filter=role))
 
 
 @router.get("/{user_id}", response_model=UserResponse)
@@ -69,8 +65,12 @@ def get_user_route(
     db: Session = Depends(get_db)
 ):
     """Get user by ID (requires authentication)"""
+    # Own profile: the auth dependency already loaded this user for the request
+    if current_user.id == user_id:
+        return current_user
+    
     # Users can only view their own profile unless admin
-    if current_user.id != user_id and current_user.role != 'admin':
+    if current_user.role != 'admin':
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized to view this user"
@@ -138,3 +138,15 @@ def add_points_route(
     
     return result
 
+
+@router.post("/add-points/bulk", response_model=List[UserResponse])
+def add_points_bulk_route(
+    points_data: BulkAddPointsRequest,
+    current_user: User = Depends(get_admin_user),  # Only admins can add points
+    db: Session = Depends(get_db)
+):
+    """Add points to many customer users at once (admin only)
+    
+    Unknown users and admins are skipped; only updated users are returned.
+    """
+    return add_points_bulk([(item.user_id, item.points) for item in points_data.items], db)
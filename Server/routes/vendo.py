@@ -1,21 +1,24 @@
-from fastapi import APIRouter, HTTPException, Depends, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, HTTPException, Depends, WebSocket, WebSocketDisconnect, Request, Query
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from schemas import VendoCommandRequest, VendoCommandResponse, VendoClassifyRequest, VendoClassifyResponse
 from controllers.vendo_controller import (
     send_command_to_esp32, 
     get_esp32_status, 
-    classify_trash_image, 
+    classify_trash_image_bytes,
     capture_and_classify_trash,
     store_customer_token,
     remove_customer_token,
     get_active_customer_token
 )
-from dependencies import get_current_user, get_current_user_optional, get_customer_user
+from dependencies import get_current_user, get_customer_user
 from models import User
-from db import SessionLocal
+from sqlalchemy.orm import Session
+from db import get_db
+from utils import get_user_id_from_token
 from typing import Optional, Dict, Set
 import logging
 import json
+import base64
 import asyncio
 from datetime import datetime
 from services.session_service import (
@@ -32,12 +35,25 @@ security = HTTPBearer()
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Classification result -> command understood by the Arduino sketch
+ARDUINO_COMMANDS = {
+    "PLASTIC": "PLASTIC",
+    "NON_PLASTIC": "CAN",
+    "REJECTED": "REJECTED",
+}
+
+# Largest raw JPEG body accepted by /capture-and-classify-upload (a 640x480 frame is ~50-100 KB)
+MAX_IMAGE_UPLOAD_BYTES = 10 * 1024 * 1024
+
 # WebSocket connection management
 # Store active WebSocket connections per user: {user_id: Set[WebSocket]}
 active_websocket_connections: Dict[int, Set[WebSocket]] = {}
 # Note: asyncio.Lock() must be created per-request, not at module level
 # We'll use a regular lock for thread safety and async-safe operations
 
+# Strong references to fire-and-forget tasks so they aren't garbage-collected mid-run
+_background_tasks: Set[asyncio.Task] = set()
+
 
 @router.post("/command", response_model=VendoCommandResponse)
 async def send_vendo_command(command: VendoCommandRequest):
@@ -99,17 +115,40 @@ async def test_esp32_connection():
     }
 
 
+def _decode_image_base64(image_base64: str) -> bytes:
+    """
+    Decode a base64 image payload inline
+    
+    binascii holds the GIL for the whole decode, so a worker thread would not free the
+    event loop - it would only add a thread hop.
+    
+    Raises:
+        HTTPException: 400 if the payload is not valid base64
+    """
+    try:
+        return base64.b64decode(image_base64)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid image_base64 payload")
+
+
 @router.post("/classify", response_model=VendoClassifyResponse)
 async def classify_trash(
     request: VendoClassifyRequest,
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)  # Same per-request session the auth lookup used
 ):
     """Classify trash image using Google Cloud Vision (with base64 image)"""
+    # Decode once at the HTTP boundary; everything below works on raw JPEG bytes
+    image_bytes = _decode_image_base64(request.image_base64 or "")
+    if not image_bytes:
+        raise HTTPException(status_code=400, detail="image_base64 is required")
+    
     try:
-        result = await classify_trash_image(
-            image_base64=request.image_base64,
+        result = await classify_trash_image_bytes(
+            image_bytes=image_bytes,
             user_id=current_user.id,
-            machine_id=request.machine_id
+            machine_id=request.machine_id,
+            db=db
         )
         
         return VendoClassifyResponse(**result)
@@ -122,7 +161,8 @@ async def classify_trash(
 async def capture_and_classify(
     request: VendoClassifyRequest,
     current_user: User = Depends(get_customer_user),
-    credentials: HTTPAuthorizationCredentials = Depends(security)
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
 ):
     """
     Capture image from webcam and classify trash
@@ -135,6 +175,68 @@ async def capture_and_classify(
     - image_base64: Optional (if provided, uses it; if not, captures from webcam)
     - machine_id: Machine ID (default: 1)
     """
+    image_bytes = None
+    if request.image_base64:
+        image_bytes = _decode_image_base64(request.image_base64)
+    return await _classify_for_customer(current_user, credentials, request.machine_id, image_bytes, db)
+
+
+@router.post("/capture-and-classify-upload", response_model=VendoClassifyResponse)
+async def capture_and_classify_upload(
+    http_request: Request,
+    machine_id: int = Query(1, description="Machine ID"),
+    current_user: User = Depends(get_customer_user),
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+):
+    """
+    Classify trash from a raw JPEG request body (Content-Type: image/jpeg)
+    Same behaviour as /capture-and-classify, but used by the Arduino bridge script
+    to avoid the base64 encode/decode, the ~33% larger body and multipart parsing
+    
+    Accepts:
+    - body: JPEG bytes
+    - machine_id: Machine ID query parameter (default: 1)
+    """
+    # Reject a declared oversized body up front, and stop reading once an undeclared
+    # (chunked) one passes the cap - don't buffer whatever a client sends
+    too_large = HTTPException(
+        status_code=413,
+        detail=f"Image body exceeds {MAX_IMAGE_UPLOAD_BYTES} bytes"
+    )
+    content_length = http_request.headers.get("content-length")
+    if content_length is not None and content_length.isdigit() and int(content_length) > MAX_IMAGE_UPLOAD_BYTES:
+        raise too_large
+    
+    image_bytes = bytearray()
+    async for chunk in http_request.stream():
+        image_bytes.extend(chunk)
+        if len(image_bytes) > MAX_IMAGE_UPLOAD_BYTES:
+            raise too_large
+    
+    if not image_bytes:
+        raise HTTPException(status_code=400, detail="Empty image body")
+    
+    return await _classify_for_customer(current_user, credentials, machine_id, bytes(image_bytes), db)
+
+
+async def _classify_for_customer(
+    current_user: User,
+    credentials: HTTPAuthorizationCredentials,
+    machine_id: int,
+    image_bytes: Optional[bytes],
+    db: Session
+) -> VendoClassifyResponse:
+    """
+    Shared capture-and-classify flow for an authenticated customer
+    
+    Args:
+        current_user: Authenticated customer
+        credentials: Bearer credentials of the request
+        machine_id: Machine ID for transaction
+        image_bytes: JPEG image bytes, or None to capture from webcam
+        db: The request's session (reused instead of checking out a second connection)
+    """
     try:
         # Check if session is active (only if Redis is available)
         # If Redis is down, fall back to token-based check
@@ -163,34 +265,23 @@ async def capture_and_classify(
         store_customer_token(current_user.id, jwt_token)
         logger.info(f"Stored token for customer user_id: {current_user.id}")
         
-        # If image_base64 is provided, use it; otherwise capture from webcam
-        if request.image_base64:
-            result = await classify_trash_image(
-                image_base64=request.image_base64,
+        # If an image is provided, use it; otherwise capture from webcam
+        if image_bytes:
+            result = await classify_trash_image_bytes(
+                image_bytes=image_bytes,
                 user_id=current_user.id,
-                machine_id=request.machine_id
+                machine_id=machine_id,
+                db=db
             )
         else:
             # Capture from webcam
             result = await capture_and_classify_trash(
-                machine_id=request.machine_id,
-                user_id=current_user.id
+                machine_id=machine_id,
+                user_id=current_user.id,
+                db=db
             )
         
-        # Add detection to Redis history (including rejected items for visibility)
-        detection_data = {
-            "material_type": result.get("material_type", "REJECTED"),
-            "confidence": result.get("confidence", 0.0),
-            "points_earned": result.get("points_earned", 0),
-            "transaction_id": result.get("transaction_id"),
-            "status": result.get("status", "unknown"),
-            "timestamp": datetime.utcnow().isoformat()
-        }
-        add_detection_to_history(current_user.id, detection_data)
-        
-        # Broadcast detection update via WebSocket (real-time)
-        logger.info(f"📡 Broadcasting detection update via WebSocket for user {current_user.id}: {detection_data['material_type']}")
-        await broadcast_detection_update(current_user.id, detection_data)
+        await publish_detection(current_user.id, result)
         
         return VendoClassifyResponse(**result)
     except HTTPException:
@@ -378,6 +469,34 @@ async def get_session_status():
         }
 
 
+@router.get("/session-and-token")
+async def get_session_and_token():
+    """
+    Get session status and active customer token in one call (no auth required)
+    Lets the bridge script gate a READY event and authenticate the classification
+    request with a single round-trip instead of /session-status + /active-token
+    """
+    try:
+        # A stored customer token is what /session-status treats as an active session
+        token = get_active_customer_token()
+        has_session = token is not None
+
+        return {
+            "status": "active" if has_session else "inactive",
+            "has_session": has_session,
+            "token": token,
+            "message": "Active session found" if has_session else "No active session"
+        }
+    except Exception as e:
+        logger.error(f"Error getting session and token: {str(e)}")
+        return {
+            "status": "error",
+            "has_session": False,
+            "token": None,
+            "message": f"Error checking session: {str(e)}"
+        }
+
+
 @router.get("/detection-history")
 async def get_user_detection_history(
     current_user: User = Depends(get_customer_user)
@@ -458,6 +577,74 @@ async def websocket_detection_updates(websocket: WebSocket, user_id: int):
         logger.info(f"WebSocket connection cleaned up for user {user_id}")
 
 
+async def publish_detection(user_id: int, result: Dict):
+    """
+    Record a classification result in the user's detection history and push it to their WebSocket clients
+    
+    Args:
+        user_id: User ID the detection belongs to
+        result: Classification result (status, material_type, confidence, points_earned, transaction_id)
+    """
+    # Add detection to Redis history (including rejected items for visibility)
+    detection_data = {
+        "material_type": result.get("material_type", "REJECTED"),
+        "confidence": result.get("confidence", 0.0),
+        "points_earned": result.get("points_earned", 0),
+        "transaction_id": result.get("transaction_id"),
+        "status": result.get("status", "unknown"),
+        "timestamp": datetime.utcnow().isoformat()
+    }
+    add_detection_to_history(user_id, detection_data)
+    
+    # Broadcast detection update via WebSocket (real-time)
+    logger.info(f"📡 Broadcasting detection update via WebSocket for user {user_id}: {detection_data['material_type']}")
+    await broadcast_detection_update(user_id, detection_data)
+
+
+async def handle_arduino_ready(machine_id: int = 1) -> str:
+    """
+    Handle a READY event when the server owns the Arduino serial port
+    (same flow as arduino_bridge.py, without the HTTP round-trips)
+    
+    Args:
+        machine_id: Machine ID for transaction
+        
+    Returns:
+        Command for the Arduino: "PLASTIC", "CAN", "REJECTED", "NO_SESSION" or "ERROR"
+    """
+    token = get_active_customer_token()
+    user_id = get_user_id_from_token(token) if token else None
+    if user_id is None:
+        logger.warning("⚠️  NO ACTIVE SESSION - Ignoring READY signal")
+        return "NO_SESSION"
+    
+    from config import get_redis_client
+    if get_redis_client() is not None and not is_session_active(user_id):
+        logger.warning(f"⚠️  No active Redis session for user {user_id} - Ignoring READY signal")
+        return "NO_SESSION"
+    
+    try:
+        result = await capture_and_classify_trash(machine_id=machine_id, user_id=user_id)
+    except Exception as e:
+        logger.error(f"Arduino READY classification error: {str(e)}")
+        return "ERROR"
+    
+    # The sort command doesn't depend on the history write / WebSocket push - reply to the
+    # Arduino now and let those run alongside instead of in front of the servo
+    task = asyncio.create_task(publish_detection(user_id, result))
+    _background_tasks.add(task)
+    task.add_done_callback(_on_publish_done)
+    
+    return ARDUINO_COMMANDS.get(result.get("material_type"), "REJECTED")
+
+
+def _on_publish_done(task: asyncio.Task) -> None:
+    """Release a background publish task and log its failure, if any"""
+    _background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Error publishing detection: {str(task.exception())}")
+
+
 async def broadcast_detection_update(user_id: int, detection_data: dict):
     """
     Broadcast detection update to all connected WebSocket clients for a user
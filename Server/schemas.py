@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr, ConfigDict
+from pydantic import BaseModel, EmailStr, ConfigDict, Field
 from typing import Optional, Generic, TypeVar, List
 from datetime import datetime
 import uuid
@@ -14,6 +14,14 @@ class PaginatedResponse(BaseModel, Generic[T]):
     has_more: bool
 
 
+class CursorPage(BaseModel, Generic[T]):
+    """Generic keyset-paginated response schema (no total - nothing is counted)"""
+    items: List[T]
+    limit: int
+    has_more: bool
+    next_cursor: Optional[str] = None  # Pass back as ?cursor= for the next page
+
+
 # User Schemas
 class UserBase(BaseModel):
     """Base user schema"""
@@ -55,6 +63,16 @@ class AddPointsRequest(BaseModel):
     points: int
 
 
+class BulkAddPointsItem(AddPointsRequest):
+    """One user's point delta in a bulk award"""
+    user_id: int
+
+
+class BulkAddPointsRequest(BaseModel):
+    """Schema for adding points to many users at once (capped so one request can't build an unbounded VALUES list)"""
+    items: List[BulkAddPointsItem] = Field(max_length=1000)
+
+
 # Machine Schemas
 class MachineBase(BaseModel):
     """Base machine schema"""
@@ -2,6 +2,7 @@
 Database seeding script
 Adds initial data: default machine, rewards, and admin user
 """
+from sqlalchemy import func, select
 from db import SessionLocal
 from models import Machine, Reward, User
 from utils import hash_password
@@ -17,7 +18,7 @@ def seed_database():
     
     try:
         # Create admin user if not exists
-        admin_user = db.query(User).filter(User.email == "admin@vendotrash.com").first()
+        admin_user = db.scalar(select(User).where(User.email == "admin@vendotrash.com"))
         if not admin_user:
             admin_user = User(
                 email="admin@vendotrash.com",
@@ -36,7 +37,7 @@ def seed_database():
             logger.info("ℹ️  Admin user already exists")
         
         # Check if machine already exists
-        existing_machine = db.query(Machine).filter(Machine.name == "VT-001").first()
+        existing_machine = db.scalar(select(Machine).where(Machine.name == "VT-001"))
         if not existing_machine:
             default_machine = Machine(
                 name="VT-001",
@@ -51,7 +52,7 @@ def seed_database():
             logger.info("ℹ️  Default machine already exists")
         
         # Check if rewards already exist
-        existing_rewards = db.query(Reward).count()
+        existing_rewards = db.scalar(select(func.count(Reward.id)))
         if existing_rewards == 0:
             rewards = [
                 Reward(
@@ -0,0 +1,181 @@
+"""
+Arduino Serial Service
+Lets the FastAPI process own the Arduino serial port when both run on the same host,
+so READY events are handled server-side without the arduino_bridge.py HTTP round-trip
+"""
+import asyncio
+import logging
+import threading
+from typing import Awaitable, Callable, Optional
+
+import serial
+
+logger = logging.getLogger(__name__)
+
+
+class ArduinoSerialService:
+    """Owns the Arduino serial connection: reads READY events and writes results back"""
+    
+    def __init__(self, port: str, baud: int = 9600, timeout: float = 1.0):
+        """
+        Initialize serial service
+        
+        Args:
+            port: Serial port (e.g., "COM3" or "/dev/ttyUSB0")
+            baud: Baud rate (must match the Arduino sketch)
+            timeout: Read timeout in seconds
+        """
+        self.port = port
+        self.baud = baud
+        self.timeout = timeout
+        self._serial: Optional[serial.Serial] = None
+        self._write_lock = asyncio.Lock()
+        self._events: Optional[asyncio.Queue] = None
+        self._stop = threading.Event()
+        self._reader_thread: Optional[threading.Thread] = None
+        self._consumer_task: Optional[asyncio.Task] = None
+    
+    async def start(self, on_ready: Callable[[], Awaitable[str]]) -> bool:
+        """
+        Open the serial port and start handling READY events
+        
+        Args:
+            on_ready: Coroutine function called per READY event; returns the
+                      command to send back to the Arduino
+                      
+        Returns:
+            True if the port was opened, False otherwise
+        """
+        try:
+            # exclusive: under `uvicorn --workers N` only the first worker gets the port;
+            # the others fail here instead of splitting READY lines and racing on replies
+            self._serial = await asyncio.to_thread(
+                serial.Serial, self.port, self.baud, timeout=self.timeout, exclusive=True
+            )
+        except serial.SerialException as e:
+            logger.error(f"❌ Failed to open Arduino serial port {self.port} (in use by another worker/process?): {str(e)}")
+            return False
+        
+        loop = asyncio.get_running_loop()
+        # At most one READY waits while another is being handled - a second one is the
+        # same object and is dropped (see _enqueue_ready)
+        self._events = asyncio.Queue(maxsize=1)
+        self._stop.clear()
+        self._reader_thread = threading.Thread(
+            target=self._read_loop,
+            args=(loop,),
+            name="arduino-serial-reader",
+            daemon=True
+        )
+        self._reader_thread.start()
+        self._consumer_task = asyncio.create_task(self._consume(on_ready))
+        
+        logger.info(f"✅ Connected to Arduino at {self.port} ({self.baud} baud)")
+        return True
+    
+    def _read_loop(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Reader thread: blocking readline, hands READY events to the event loop"""
+        while not self._stop.is_set():
+            try:
+                raw = self._serial.readline()
+            except serial.SerialException as e:
+                logger.error(f"Arduino serial read error: {str(e)}")
+                break
+            
+            if not raw:
+                continue
+            
+            line = raw.decode('utf-8', errors='replace').strip()
+            logger.info(f"Received from Arduino: {line}")
+            if line == "READY":
+                loop.call_soon_threadsafe(self._enqueue_ready)
+    
+    def _enqueue_ready(self) -> None:
+        """Queue a READY event (runs on the event loop)"""
+        if self._events.full():
+            # A READY is already waiting - same object, don't classify it twice
+            logger.info("READY received while another is still queued - dropping duplicate")
+            return
+        self._events.put_nowait("READY")
+    
+    async def _consume(self, on_ready: Callable[[], Awaitable[str]]) -> None:
+        """Handle READY events one at a time and reply to the Arduino"""
+        while True:
+            await self._events.get()
+            try:
+                result = await on_ready()
+            except Exception as e:
+                logger.error(f"Error handling Arduino READY event: {str(e)}")
+                result = "ERROR"
+            await self.write(result)
+    
+    async def write(self, message: str) -> None:
+        """
+        Send a newline-terminated message to the Arduino
+        
+        Args:
+            message: Message to send (e.g., "PLASTIC", "ERROR")
+        """
+        async with self._write_lock:
+            await asyncio.to_thread(self._serial.write, f"{message}\n".encode('utf-8'))
+        logger.info(f"Sent to Arduino: {message}")
+    
+    async def stop(self) -> None:
+        """Stop handling events and close the serial port"""
+        self._stop.set()
+        if self._consumer_task is not None:
+            self._consumer_task.cancel()
+            self._consumer_task = None
+        if self._reader_thread is not None:
+            await asyncio.to_thread(self._reader_thread.join, self.timeout * 2)
+            self._reader_thread = None
+        if self._serial is not None:
+            self._serial.close()
+            self._serial = None
+        logger.info("Arduino serial port closed")
+
+
+# Global instance (only created when ARDUINO_SERIAL_PORT is configured)
+_arduino_serial_service: Optional[ArduinoSerialService] = None
+
+
+def get_arduino_serial_service() -> Optional[ArduinoSerialService]:
+    """
+    Get the running Arduino serial service
+    
+    Returns:
+        ArduinoSerialService instance, or None if the server doesn't own the port
+    """
+    return _arduino_serial_service
+
+
+async def start_arduino_serial(port: Optional[str], baud: int, on_ready: Callable[[], Awaitable[str]]) -> bool:
+    """
+    Start the Arduino serial service if a port is configured
+    
+    Args:
+        port: Serial port, or None to leave the port to arduino_bridge.py
+        baud: Baud rate
+        on_ready: Coroutine function called per READY event
+        
+    Returns:
+        True if the server now owns the serial port, False otherwise
+    """
+    global _arduino_serial_service
+    if not port:
+        logger.info("ARDUINO_SERIAL_PORT not set - Arduino handled by arduino_bridge.py")
+        return False
+    
+    service = ArduinoSerialService(port, baud)
+    if await service.start(on_ready):
+        _arduino_serial_service = service
+        return True
+    return False
+
+
+async def stop_arduino_serial() -> None:
+    """Stop the Arduino serial service if running"""
+    global _arduino_serial_service
+    if _arduino_serial_service is not None:
+        await _arduino_serial_service.stop()
+        _arduino_serial_service = None
@@ -3,7 +3,6 @@ Vision Service for Google Cloud Vision API
 Classifies trash images as PLASTIC or NON_PLASTIC
 """
 from google.cloud import vision
-import base64
 import logging
 from typing import Dict, Optional
 from config import get_google_credentials_path
@@ -70,12 +69,12 @@ class VisionService:
             logger.error(f"Error initializing Vision client: {str(e)}")
             self.client = None
     
-    async def classify_trash(self, image_base64: str) -> Dict[str, any]:
+    async def classify_trash_bytes(self, image_data: bytes) -> Dict[str, any]:
         """
-        Classify trash image using Google Cloud Vision API
+        Classify raw JPEG image bytes using Google Cloud Vision API
         
         Args:
-            image_base64: Base64 encoded JPEG image
+            image_data: JPEG image bytes
             
         Returns:
             Dict with material_type, confidence, and labels
@@ -84,8 +83,6 @@ class VisionService:
             raise Exception("Google Cloud Vision API not configured. Please set GOOGLE_APPLICATION_CREDENTIALS.")
         
         try:
-            # Decode base64 image
-            image_data = base64.b64decode(image_base64)
             image = vision.Image(content=image_data)
             
             # Perform label detection
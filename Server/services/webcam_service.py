@@ -2,16 +2,18 @@
 Webcam Service for capturing images from USB webcam
 """
 import cv2
-import base64
 import logging
 import time
 import sys
-from typing import Optional, Tuple
-import io
-from PIL import Image
+import threading
+from typing import Dict, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+# JPEG encoding: quality 80 is plenty for Vision API labels and gives smaller uploads than the previous 85
+JPEG_QUALITY = 80
+JPEG_ENCODE_PARAMS = [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY, cv2.IMWRITE_JPEG_OPTIMIZE, 1]
+
 
 class WebcamService:
     """Service for capturing images from USB webcam - Event-driven for Arduino bridge"""
@@ -27,6 +29,10 @@ class WebcamService:
         self.camera = None
         self._lock_count = 0  # Track how many times camera is opened
         self._max_retries = 3
+        self._mjpeg_passthrough = False  # True when read() yields the device's JPEG bitstream
+        # Captures run in worker threads (asyncio.to_thread); cv2.VideoCapture is not safe to
+        # drive from two threads at once, so every use of self.camera goes through this lock
+        self._camera_lock = threading.Lock()
     
     def _open_camera(self) -> bool:
         """Open camera connection with retry logic"""
@@ -49,8 +55,11 @@ class WebcamService:
                         # Set camera resolution
                         self.camera.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
                         self.camera.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+                        # Ask for MJPG from the device (less USB bandwidth than raw YUYV)
+                        self.camera.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
                         # Set buffer size to 1 to get latest frame
                         self.camera.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+                        self._mjpeg_passthrough = self._enable_mjpeg_passthrough()
                         logger.info(f"Camera opened successfully at index {self.camera_index}")
                         return True
                     else:
@@ -72,31 +81,67 @@ class WebcamService:
             logger.error(f"Error opening camera: {str(e)}")
             return False
     
+    def _enable_mjpeg_passthrough(self) -> bool:
+        """
+        Try to receive the camera's MJPG frames undecoded (V4L2 only)
+        
+        With CAP_PROP_CONVERT_RGB off, OpenCV's V4L2 backend returns the compressed
+        JPEG buffer from read(), so captures skip a full JPEG decode + re-encode.
+        
+        Returns:
+            True if passthrough is active, False to use the decode/encode path
+        """
+        try:
+            if self.camera.getBackendName() != "V4L2":
+                return False
+            if int(self.camera.get(cv2.CAP_PROP_FOURCC)) != cv2.VideoWriter_fourcc(*'MJPG'):
+                return False
+            
+            self.camera.set(cv2.CAP_PROP_CONVERT_RGB, 0)
+            ret, frame = self.camera.read()
+            if ret and _is_jpeg_buffer(frame):
+                logger.info("Camera supplies MJPG - using JPEG passthrough (no re-encode)")
+                return True
+            
+            # Device/backend didn't hand back a JPEG buffer - restore decoded frames
+            self.camera.set(cv2.CAP_PROP_CONVERT_RGB, 1)
+            return False
+        except Exception as e:
+            logger.warning(f"MJPG passthrough not available: {str(e)}")
+            return False
+    
     def _close_camera(self):
         """Close camera connection"""
         if self.camera is not None:
             self.camera.release()
             self.camera = None
     
-    def capture_image(self, timeout: int = 3) -> Optional[str]:
+    def capture_image_bytes(self, timeout: int = 3) -> Optional[bytes]:
         """
-        Capture image from webcam and return as base64 string
-        Event-driven: Called when Arduino bridge receives "READY" signal
+        Capture image from webcam and return raw JPEG bytes
+        
+        Concurrent callers (HTTP requests, serial READY events) are serialized.
         
         Args:
             timeout: Maximum number of attempts to capture a valid frame
             
         Returns:
-            Base64 encoded JPEG image string, or None if capture failed
+            JPEG image bytes, or None if capture failed
         """
+        with self._camera_lock:
+            return self._capture_image_bytes(timeout)
+    
+    def _capture_image_bytes(self, timeout: int) -> Optional[bytes]:
+        """capture_image_bytes body; caller holds self._camera_lock"""
         try:
             if not self._open_camera():
                 logger.error("Camera not available for capture")
                 return None
             
             # Flush buffer to get latest frame (important for event-driven capture)
+            # grab() skips decoding, so discarding stale frames is cheap
             for _ in range(2):
-                self.camera.read()  # Discard old frames
+                self.camera.grab()  # Discard old frames
             
             # Try to capture a valid frame
             for attempt in range(timeout):
@@ -113,28 +158,34 @@ class WebcamService:
                     time.sleep(0.1)
                     continue
                 
-                # Validate frame has content (not all black)
-                if frame.mean() < 5:  # Very dark frame, might be invalid
+                if self._mjpeg_passthrough:
+                    # Frame is already a JPEG - check brightness on a 1/8-scale grayscale decode
+                    preview = cv2.imdecode(frame, cv2.IMREAD_REDUCED_GRAYSCALE_8)
+                    if preview is None or preview.mean() < 5:
+                        logger.warning(f"Frame too dark or corrupt (attempt {attempt + 1}/{timeout})")
+                        time.sleep(0.1)
+                        continue
+                    
+                    image_bytes = frame.tobytes()
+                    logger.info(f"Successfully captured image: {len(image_bytes)} bytes (MJPG passthrough)")
+                    return image_bytes
+                
+                # Validate frame has content (not all black) - every 8th pixel per axis is plenty
+                # for a brightness check, the same 1/8 scale as the passthrough preview above
+                if frame[::8, ::8].mean() < 5:  # Very dark frame, might be invalid
                     logger.warning(f"Frame too dark (attempt {attempt + 1}/{timeout})")
                     time.sleep(0.1)
                     continue
                 
-                # Convert BGR to RGB (OpenCV uses BGR, PIL uses RGB)
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                
-                # Convert to PIL Image
-                pil_image = Image.fromarray(frame_rgb)
-                
-                # Convert to JPEG bytes
-                buffer = io.BytesIO()
-                pil_image.save(buffer, format='JPEG', quality=85)
-                image_bytes = buffer.getvalue()
-                
-                # Encode to base64
-                image_base64 = base64.b64encode(image_bytes).decode('utf-8')
+                # Encode BGR frame straight to JPEG bytes
+                ok, buffer = cv2.imencode('.jpg', frame, JPEG_ENCODE_PARAMS)
+                if not ok:
+                    logger.warning(f"Failed to encode frame (attempt {attempt + 1}/{timeout})")
+                    continue
+                image_bytes = buffer.tobytes()
                 
                 logger.info(f"Successfully captured image: {len(image_bytes)} bytes")
-                return image_base64
+                return image_bytes
             
             logger.error("Failed to capture valid frame after all attempts")
             return None
@@ -143,6 +194,20 @@ class WebcamService:
             logger.error(f"Error capturing image: {str(e)}")
             return None
     
+    def keep_warm(self) -> None:
+        """
+        Grab and discard one frame so the device stays streaming and the
+        next capture doesn't start from a stale queued frame.
+        Called by the Arduino bridge while idle; skipped while a capture holds the camera.
+        """
+        if not self._camera_lock.acquire(blocking=False):
+            return
+        try:
+            if self.camera is not None and self.camera.isOpened():
+                self.camera.grab()
+        finally:
+            self._camera_lock.release()
+    
     def capture_and_save(self, filepath: str) -> bool:
         """
         Capture image and save to file (for debugging)
@@ -153,6 +218,11 @@ class WebcamService:
         Returns:
             True if successful, False otherwise
         """
+        with self._camera_lock:
+            return self._capture_and_save(filepath)
+    
+    def _capture_and_save(self, filepath: str) -> bool:
+        """capture_and_save body; caller holds self._camera_lock"""
         try:
             if not self._open_camera():
                 return False
@@ -161,7 +231,12 @@ class WebcamService:
             if not ret:
                 return False
             
-            cv2.imwrite(filepath, frame)
+            if self._mjpeg_passthrough:
+                # Frame is already JPEG-encoded
+                with open(filepath, 'wb') as f:
+                    f.write(frame.tobytes())
+            else:
+                cv2.imwrite(filepath, frame)
             logger.info(f"Image saved to {filepath}")
             return True
             
@@ -174,8 +249,17 @@ class WebcamService:
         self._close_camera()
 
 
-# Global instance (singleton pattern)
-_webcam_service_instance: Optional[WebcamService] = None
+def _is_jpeg_buffer(frame) -> bool:
+    """Check whether a captured frame is a compressed JPEG buffer (starts with the SOI marker)"""
+    if frame is None or frame.size < 2:
+        return False
+    data = frame.reshape(-1)
+    return data[0] == 0xFF and data[1] == 0xD8
+
+
+# Global instances (one singleton per camera index)
+_webcam_service_instances: Dict[int, WebcamService] = {}
+_webcam_service_instances_lock = threading.Lock()
 
 
 def get_webcam_service(camera_index: int = 0) -> WebcamService:
@@ -188,8 +272,13 @@ def get_webcam_service(camera_index: int = 0) -> WebcamService:
     Returns:
         WebcamService instance
     """
-    global _webcam_service_instance
-    if _webcam_service_instance is None:
-        _webcam_service_instance = WebcamService(camera_index)
-    return _webcam_service_instance
+    service = _webcam_service_instances.get(camera_index)
+    if service is None:
+        # Called from worker threads: two first calls must not create two services (and two
+        # VideoCaptures) for one camera
+        with _webcam_service_instances_lock:
+            service = _webcam_service_instances.get(camera_index)
+            if service is None:
+                service = _webcam_service_instances[camera_index] = WebcamService(camera_index)
+    return service
 
@@ -0,0 +1,74 @@
+"""
+User Change Listener Test Script for VendoTrash
+Checks that a user_changed NOTIFY from one connection reaches this process's listener callback
+(the cross-worker user/auth cache invalidation path; other channels share the same thread)
+"""
+import sys
+import logging
+import threading
+from sqlalchemy import select
+from db import (
+    SessionLocal,
+    USER_CHANGED_CHANNEL,
+    notify_user_changed,
+    start_change_listener,
+    stop_change_listener,
+    wait_for_change_listener
+)
+from models import User
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+TIMEOUT_SECONDS = 5
+
+
+def test_notify_reaches_callback() -> bool:
+    """Start the listener, commit a notify_user_changed, and wait for the callback to see it"""
+    received = []
+    delivered = threading.Event()
+    
+    def on_user_changed(payload: str) -> None:
+        received.append(int(payload))
+        delivered.set()
+    
+    start_change_listener({USER_CHANGED_CHANNEL: on_user_changed})
+    try:
+        if not wait_for_change_listener(TIMEOUT_SECONDS):
+            logger.error(f"❌ Listener did not issue LISTEN within {TIMEOUT_SECONDS}s")
+            return False
+        
+        db = SessionLocal()
+        try:
+            # Any existing id works - the payload is only parsed, not looked up
+            user_id = db.scalar(select(User.id).limit(1)) or 0
+            notify_user_changed(db, user_id)
+            db.commit()
+        finally:
+            db.close()
+        
+        if not delivered.wait(TIMEOUT_SECONDS):
+            logger.error(f"❌ No notification reached the callback within {TIMEOUT_SECONDS}s")
+            return False
+        
+        if received[0] != user_id:
+            logger.error(f"❌ Callback got user_id {received[0]}, expected {user_id}")
+            return False
+        
+        logger.info(f"✅ Notification for user_id {user_id} reached the callback")
+        return True
+    finally:
+        stop_change_listener()
+
+
+def main():
+    """Run the listener test"""
+    print("=" * 60)
+    print("user_changed Listener Test")
+    print("=" * 60)
+    
+    return 0 if test_notify_reaches_callback() else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,22 +1,52 @@
 import hashlib
-from typing import Optional
+import hmac
+from typing import Any, Callable, Optional
 from datetime import datetime, timedelta
-from jose import JWTError, jwt
-from config import settings
+import logging
+from fastapi.responses import ORJSONResponse
+from jose import JWTError, jwk, jwt
+from sqlalchemy import Select, func
+from sqlalchemy.orm import Session
+from config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
 
 # JWT Configuration
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30 * 24 * 60  # 30 days
 
 
+def _load_jwt_key():
+    """Build the signing/verification key object once (settings are immutable)
+    
+    jose accepts a prepared Key and skips re-constructing it from the secret on every
+    encode/decode.
+    """
+    # Use secret key from settings, or fallback for development
+    secret_key = settings.SECRET_KEY if settings.SECRET_KEY else "dev-secret-key-change-in-production-min-32-chars"
+    
+    if len(secret_key) < 16:
+        logger.warning("SECRET_KEY is very short! Consider using at least 32 characters for production.")
+        # Still use it, but warn
+    
+    return jwk.construct(secret_key, ALGORITHM)
+
+
+_JWT_KEY = _load_jwt_key()
+
+
 def hash_password(password: str) -> str:
     """Simple password hashing (use bcrypt in production)"""
     return hashlib.sha256(password.encode()).hexdigest()
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify password against hash"""
-    return hash_password(plain_password) == hashed_password
+    """Verify password against hash
+    
+    One SHA-256 digest (microseconds) - cheaper than any cache lookup, so it is not memoized.
+    """
+    return hmac.compare_digest(hash_password(plain_password), hashed_password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -34,30 +64,20 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     
     to_encode.update({"exp": expire})
     
-    # Use secret key from settings, or fallback for development
-    secret_key = settings.SECRET_KEY if settings.SECRET_KEY else "dev-secret-key-change-in-production-min-32-chars"
-    
-    if len(secret_key) < 16:
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.warning("SECRET_KEY is very short! Consider using at least 32 characters for production.")
-        # Still use it, but warn
-    
-    encoded_jwt = jwt.encode(to_encode, secret_key, algorithm=ALGORITHM)
+    encoded_jwt = jwt.encode(to_encode, _JWT_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
 def verify_token(token: str) -> Optional[dict]:
     """Verify JWT token and return payload"""
     try:
-        # Use same secret key logic as create_access_token
-        secret_key = settings.SECRET_KEY if settings.SECRET_KEY else "dev-secret-key-change-in-production-min-32-chars"
-        
-        payload = jwt.decode(token, secret_key, algorithms=[ALGORITHM])
+        # Same key object as create_access_token; claim presence is checked in the same decode pass
+        payload = jwt.decode(
+            token, _JWT_KEY, algorithms=[ALGORITHM],
+            options={"require_sub": True, "require_exp": True}
+        )
         return payload
     except JWTError as e:
-        import logging
-        logger = logging.getLogger(__name__)
         logger.error(f"Token verification failed: {str(e)}")
         return None
 
@@ -72,3 +92,43 @@ def get_user_id_from_token(token: str) -> Optional[int]:
             return int(sub) if isinstance(sub, str) else sub
     return None
 
+
+def paginate(db: Session, stmt: Select, count_stmt: Select, skip: int, limit: int, to_item: Callable[[Any], Any]) -> dict:
+    """Run one offset page of an ordered SELECT and build the paginated dict the list routes return
+    
+    COUNT(*) OVER() carries the total on every row, so a page costs one round-trip instead of
+    a separate COUNT; only a page past the end (no rows to carry it) runs count_stmt.
+    
+    Args:
+        stmt: Ordered, filtered SELECT without offset/limit
+        count_stmt: SELECT count(...) with the same filters
+        to_item: Builds a response item from a result row (the row also has a "total" column)
+    """
+    rows = db.execute(
+        stmt.add_columns(func.count().over().label("total")).offset(skip).limit(limit)
+    ).all()
+    if rows:
+        total = rows[0].total
+    else:
+        total = db.scalar(count_stmt) if skip else 0
+    return {
+        "items": [to_item(row) for row in rows],
+        "total": total,
+        "skip": skip,
+        "limit": limit,
+        "has_more": (skip + limit) < total
+    }
+
+
+def paginated_response(page: dict) -> ORJSONResponse:
+    """Render a controller's paginated dict directly, skipping response_model re-validation
+    
+    Items are built with model_construct from DB rows, so their values already have the
+    declared types; the route keeps response_model for the OpenAPI schema only.
+    """
+    return ORJSONResponse({**page, "items": [item.model_dump(mode="json") for item in page["items"]]})
+
+
+def list_response(items: list) -> ORJSONResponse:
+    """Render a controller's list of model_construct-built items directly (see paginated_response)"""
+    return ORJSONResponse([item.model_dump(mode="json") for item in items])